@@ -1,14 +1,46 @@
+import os
+from sqlalchemy import event, make_url
 from sqlmodel import SQLModel, create_engine, Session
 
-DATABASE_URL = "sqlite:///./data/facilities.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/facilities.db")
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Connection pool: every request holds one connection for as long as its session is open
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# WAL lets readers run alongside a writer, writers wait for each other instead of failing
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # durable with WAL, fsyncs only on checkpoints
+    "busy_timeout": 5000,  # ms to wait for a lock before "database is locked"
+    "cache_size": -64000,  # 64 MB page cache per connection
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+url = make_url(DATABASE_URL)
+engine_args = {}
+if url.get_backend_name() == "sqlite":
+    engine_args["connect_args"] = {"check_same_thread": False}
+# in-memory SQLite uses a SingletonThreadPool, which has no size or overflow
+if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+    engine_args.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+
+engine = create_engine(DATABASE_URL, **engine_args)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
+# One session per request (see get_context in main.py), closed when the request is done
 def get_session():
     with Session(engine) as session:
-        yield session 
\ No newline at end of file
+        yield session
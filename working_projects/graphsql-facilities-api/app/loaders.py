@@ -0,0 +1,34 @@
+from typing import Any, Dict, List, Optional, Type
+from collections import defaultdict
+from strawberry.dataloader import DataLoader
+from sqlmodel import SQLModel, Session, select
+import logging
+from .models import FacilityRecord
+
+logger = logging.getLogger(__name__)
+
+# Batches every key requested for `column` in one tick into a single
+# `WHERE column IN (...)` query. Each key resolves to its record (or None), with
+# many=True to the list of records sharing it, e.g. all auth records of a facility.
+# Queries run on the session of the request the loader belongs to.
+def create_loader(session: Session, model: Type[SQLModel], column: Any, many: bool = False) -> DataLoader:
+    async def load(keys: List[Any]) -> List[Any]:
+        logger.info(f"Loading {len(keys)} {model.__tablename__} records by {column.key}")
+        records = session.exec(select(model).where(column.in_(keys))).all()
+
+        if many:
+            grouped: Dict[Any, List[SQLModel]] = defaultdict(list)
+            for record in records:
+                grouped[getattr(record, column.key)].append(record)
+            return [grouped.get(key, []) for key in keys]
+
+        by_key: Dict[Any, Optional[SQLModel]] = {getattr(record, column.key): record for record in records}
+        return [by_key.get(key) for key in keys]
+
+    return DataLoader(load_fn=load)
+
+# Fresh loaders for every request, so their caches never outlive it
+def create_loaders(session: Session) -> Dict[str, DataLoader]:
+    return {
+        "facility_loader": create_loader(session, FacilityRecord, FacilityRecord.facility_id),
+    }
@@ -1,8 +1,10 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from strawberry.fastapi import GraphQLRouter
+from sqlmodel import Session
 from .schema import schema
-from .database import create_db_and_tables
+from .database import create_db_and_tables, get_session
+from .loaders import create_loaders
 
 app = FastAPI(
     title="Facilities API",
@@ -23,8 +25,14 @@ app.add_middleware(
 def on_startup():
     create_db_and_tables()
 
+# Called for every request: the resolvers and loaders of a request share its session,
+# which FastAPI closes (returning its connection to the pool) once the request is done
+async def get_context(session: Session = Depends(get_session)):
+    return {"session": session, **create_loaders(session)}
+
 graphql_app = GraphQLRouter(
     schema,
+    context_getter=get_context,
     graphiql=True  # Enables the GraphQL Playground UI
 )
 app.include_router(graphql_app, prefix="/graphql")
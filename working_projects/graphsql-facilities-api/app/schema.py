@@ -5,7 +5,6 @@ from strawberry.types import Info
 from sqlmodel import select
 import logging
 from .models import FacilityRecord
-from .database import get_session
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -65,10 +64,10 @@ class Facility:
 @strawberry.type
 class Query:
     @strawberry.field
-    def facility(self, info: Info, facility_id: int) -> Optional[Facility]:
+    async def facility(self, info: Info, facility_id: int) -> Optional[Facility]:
         logger.info(f"Querying facility with ID: {facility_id}")
-        session = next(get_session())
-        record = session.get(FacilityRecord, facility_id)
+        # Batched with every other facility lookup of the request (see loaders.py)
+        record = await info.context["facility_loader"].load(facility_id)
         if record:
             logger.info(f"Found facility: {record.facility_name}")
         else:
@@ -78,7 +77,7 @@ class Query:
     @strawberry.field
     def facilities(self, info: Info) -> List[Facility]:
         logger.info("Querying all facilities")
-        session = next(get_session())
+        session = info.context["session"]
         records = session.exec(select(FacilityRecord)).all()
         logger.info(f"Found {len(records)} facilities")
         return [convert_facility_record_to_graphql(record) for record in records]
@@ -86,7 +85,7 @@ class Query:
     @strawberry.field
     def facilities_by_city(self, info: Info, city: str) -> List[Facility]:
         logger.info(f"Querying facilities in city: {city}")
-        session = next(get_session())
+        session = info.context["session"]
         records = session.exec(select(FacilityRecord).where(FacilityRecord.city == city)).all()
         logger.info(f"Found {len(records)} facilities in {city}")
         return [convert_facility_record_to_graphql(record) for record in records]
@@ -94,7 +93,7 @@ class Query:
     @strawberry.field
     def facilities_by_state(self, info: Info, state: str) -> List[Facility]:
         logger.info(f"Querying facilities in state: {state}")
-        session = next(get_session())
+        session = info.context["session"]
         records = session.exec(select(FacilityRecord).where(FacilityRecord.state == state)).all()
         logger.info(f"Found {len(records)} facilities in state {state}")
         return [convert_facility_record_to_graphql(record) for record in records]
@@ -109,7 +108,7 @@ class Query:
         auth_type: Optional[str] = None,
     ) -> List[Facility]:
         logger.info(f"Searching facilities with params: name={facility_name}, city={city}, state={state}, auth_type={auth_type}")
-        session = next(get_session())
+        session = info.context["session"]
         query = select(FacilityRecord)
         
         if facility_name:
@@ -134,7 +133,7 @@ class Mutation:
         input: FacilityInput
     ) -> Facility:
         logger.info(f"Creating new facility: {input.facility_name}")
-        session = next(get_session())
+        session = info.context["session"]
         facility_record = FacilityRecord(
             source=input.source,
             facility_name=input.facility_name,
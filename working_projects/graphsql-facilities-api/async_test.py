@@ -1,6 +1,6 @@
 import asyncio
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, List
 import time
 from datetime import datetime
 from tqdm import tqdm
@@ -75,6 +75,20 @@ class AsyncFacilityAPIClient:
         """ % id
         return await self.execute_query(query)
 
+    async def get_facilities_by_ids(self, ids: List[int]) -> Dict[str, Any]:
+        # One document with an aliased facility lookup per ID
+        lookups = "".join("""
+            facility%d: facility(facilityId: %d) {
+                facilityId
+                facilityName
+                city
+            }""" % (id, id) for id in ids)
+        query = """
+        {%s
+        }
+        """ % lookups
+        return await self.execute_query(query)
+
     async def get_facilities_by_city(self, city: str) -> Dict[str, Any]:
         query = """
         {
@@ -142,6 +156,26 @@ async def main():
         for id, result in zip(ids, results):
             print(f"Facility {id}: {result}")
 
+        # Query every facility in one document
+        print("\n=== Querying all facilities by ID in one request ===")
+        query_batch_start = time.time()
+        result = await client.get_facilities_by_ids(list(range(1, 26)))
+        batch_facilities = [f for f in (result.get('data') or {}).values() if f]
+        query_batch_end = time.time()
+        stats['query_batch_time'] = query_batch_end - query_batch_start
+        stats['batch_facilities'] = len(batch_facilities)
+        print(f"Found {len(batch_facilities)} of 25 facilities")
+
+        # Query facilities under load, 100 requests each with its own session
+        print("\n=== Querying 100 facilities in separate requests ===")
+        query_load_start = time.time()
+        tasks = [client.get_facility_by_id(id % 25 + 1) for id in range(100)]
+        results = await asyncio.gather(*tasks)
+        query_load_end = time.time()
+        stats['query_load_time'] = query_load_end - query_load_start
+        stats['load_errors'] = sum(1 for result in results if result.get('errors'))
+        print(f"Requests with errors: {stats['load_errors']}")
+
         # Query by city
         print("\n=== Querying facilities by city ===")
         query_city_start = time.time()
@@ -169,6 +203,9 @@ async def main():
             ["Average time per batch", f"{stats['create_time']/5:.2f}s"],
             ["Query all time", f"{stats['query_all_time']:.2f}s"],
             ["Query specific time", f"{stats['query_specific_time']:.2f}s"],
+            ["Query batch time", f"{stats['query_batch_time']:.2f}s"],
+            ["Query load time", f"{stats['query_load_time']:.2f}s"],
+            ["Load requests with errors", stats['load_errors']],
             ["Query city time", f"{stats['query_city_time']:.2f}s"],
             ["Total facilities", stats['total_facilities']],
             ["City facilities", stats['city_facilities']],
@@ -1,5 +1,5 @@
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, List
 import time
 from datetime import datetime
 from tqdm import tqdm
@@ -73,6 +73,20 @@ class FacilityAPIClient:
         """ % id
         return self.execute_query(query)
 
+    def get_facilities_by_ids(self, ids: List[int]) -> Dict[str, Any]:
+        # One document with an aliased facility lookup per ID
+        lookups = "".join("""
+            facility%d: facility(facilityId: %d) {
+                facilityId
+                facilityName
+                city
+            }""" % (id, id) for id in ids)
+        query = """
+        {%s
+        }
+        """ % lookups
+        return self.execute_query(query)
+
     def get_facilities_by_city(self, city: str) -> Dict[str, Any]:
         query = """
         {
@@ -129,6 +143,25 @@ def main():
     query_specific_end = time.time()
     stats['query_specific_time'] = query_specific_end - query_specific_start
 
+    # Query every facility in one document
+    print("\n=== Querying all facilities by ID in one request ===")
+    query_batch_start = time.time()
+    result = client.get_facilities_by_ids(list(range(1, 26)))
+    batch_facilities = [f for f in (result.get('data') or {}).values() if f]
+    query_batch_end = time.time()
+    stats['query_batch_time'] = query_batch_end - query_batch_start
+    stats['batch_facilities'] = len(batch_facilities)
+    print(f"Found {len(batch_facilities)} of 25 facilities")
+
+    # Query facilities under load, 100 requests each with its own session
+    print("\n=== Querying 100 facilities in separate requests ===")
+    query_load_start = time.time()
+    results = [client.get_facility_by_id(id % 25 + 1) for id in range(100)]
+    query_load_end = time.time()
+    stats['query_load_time'] = query_load_end - query_load_start
+    stats['load_errors'] = sum(1 for result in results if result.get('errors'))
+    print(f"Requests with errors: {stats['load_errors']}")
+
     # Query by city
     print("\n=== Querying facilities by city ===")
     query_city_start = time.time()
@@ -156,6 +189,9 @@ def main():
         ["Average time per facility", f"{stats['create_time']/25:.2f}s"],
         ["Query all time", f"{stats['query_all_time']:.2f}s"],
         ["Query specific time", f"{stats['query_specific_time']:.2f}s"],
+        ["Query batch time", f"{stats['query_batch_time']:.2f}s"],
+        ["Query load time", f"{stats['query_load_time']:.2f}s"],
+        ["Load requests with errors", stats['load_errors']],
         ["Query city time", f"{stats['query_city_time']:.2f}s"],
         ["Total facilities", stats['total_facilities']],
         ["City facilities", stats['city_facilities']],
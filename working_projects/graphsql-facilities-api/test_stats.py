@@ -15,35 +15,38 @@ def load_stats(filename: str) -> Dict:
     stats['timestamp'] = datetime.fromisoformat(stats['timestamp'])
     return stats
 
-def compare_stats(sync_stats: Dict, async_stats: Dict):
+TIMED_METRICS = [
+    ("Creation time (s)", 'create_time'),
+    ("Query all time (s)", 'query_all_time'),
+    ("Query specific time (s)", 'query_specific_time'),
+    ("Query batch time (s)", 'query_batch_time'),
+    ("Query load time (s)", 'query_load_time'),
+    ("Query city time (s)", 'query_city_time'),
+    ("Total time (s)", 'total_time'),
+]
+
+def compare_stats(sync_stats: Dict, async_stats: Dict, labels=("Synchronous", "Asynchronous")):
     comparison = [
-        ["Metric", f"Synchronous\n({sync_stats['version']})", 
-         f"Asynchronous\n({async_stats['version']})", "Difference", "Improvement"],
+        ["Metric", f"{labels[0]}\n({sync_stats['version']})", 
+         f"{labels[1]}\n({async_stats['version']})", "Difference", "Improvement"],
         ["Test run at", sync_stats['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
          async_stats['timestamp'].strftime('%Y-%m-%d %H:%M:%S'), "-", "-"],
         ["Facilities created", sync_stats['facilities_created'],
          async_stats['facilities_created'], "-", "-"],
-        ["Creation time (s)", f"{sync_stats['create_time']:.2f}",
-         f"{async_stats['create_time']:.2f}",
-         f"{sync_stats['create_time'] - async_stats['create_time']:.2f}",
-         f"{(1 - async_stats['create_time']/sync_stats['create_time'])*100:.1f}%"],
-        ["Query all time (s)", f"{sync_stats['query_all_time']:.2f}",
-         f"{async_stats['query_all_time']:.2f}",
-         f"{sync_stats['query_all_time'] - async_stats['query_all_time']:.2f}",
-         f"{(1 - async_stats['query_all_time']/sync_stats['query_all_time'])*100:.1f}%"],
-        ["Query specific time (s)", f"{sync_stats['query_specific_time']:.2f}",
-         f"{async_stats['query_specific_time']:.2f}",
-         f"{sync_stats['query_specific_time'] - async_stats['query_specific_time']:.2f}",
-         f"{(1 - async_stats['query_specific_time']/sync_stats['query_specific_time'])*100:.1f}%"],
-        ["Query city time (s)", f"{sync_stats['query_city_time']:.2f}",
-         f"{async_stats['query_city_time']:.2f}",
-         f"{sync_stats['query_city_time'] - async_stats['query_city_time']:.2f}",
-         f"{(1 - async_stats['query_city_time']/sync_stats['query_city_time'])*100:.1f}%"],
-        ["Total time (s)", f"{sync_stats['total_time']:.2f}",
-         f"{async_stats['total_time']:.2f}",
-         f"{sync_stats['total_time'] - async_stats['total_time']:.2f}",
-         f"{(1 - async_stats['total_time']/sync_stats['total_time'])*100:.1f}%"],
     ]
+    # Stats saved by older versions of the tests may not have every metric
+    for name, key in TIMED_METRICS:
+        if key not in sync_stats or key not in async_stats:
+            continue
+        comparison.append([name, f"{sync_stats[key]:.2f}",
+         f"{async_stats[key]:.2f}",
+         f"{sync_stats[key] - async_stats[key]:.2f}",
+         f"{(1 - async_stats[key]/sync_stats[key])*100:.1f}%"])
     
     print("\n=== Performance Comparison ===")
-    print(tabulate(comparison, headers="firstrow", tablefmt="grid")) 
\ No newline at end of file
+    print(tabulate(comparison, headers="firstrow", tablefmt="grid"))
+
+def compare_baseline():
+    for filename in ('sync_stats.json', 'async_stats.json'):
+        print(f"\n=== {filename}: baseline vs current ===")
+        compare_stats(load_stats(f"baseline/{filename}"), load_stats(filename), labels=("Baseline", "Current"))
@@ -0,0 +1,181 @@
+import numpy as np
+from settings import *
+
+# Batched version of Ray.cast: instead of one Python object per column walking the
+# grid on its own, every column is an element of a NumPy array and all of them take
+# their grid steps together (lock-step DDA). The maths is exactly the one from Ray.cast:
+# a horizontal pass over the row boundaries, a vertical pass over the column
+# boundaries, and the closest of both wins. Since the map has a solid border, every ray
+# that starts inside the map hits a wall after at most max(rows, cols) + 1 steps.
+
+
+# walks every ray from (x, y) by (step_x, step_y) until it hits a wall or leaves the map.
+# x and y are updated in place, so for the rays that found a wall they end up holding the hit point.
+#
+# With skip, rays use the map's clearance to jump: a ray in a tile with clearance c is inside
+# an empty box reaching c - 1 tiles past its tile in every direction, so all the steps that
+# move it at most that far (in x and in y) can be taken at once without looking at the grid.
+#
+# With stop, every ray gives up (without finding a wall) once it would take more than stop steps.
+def _march(map, x, y, step_x, step_y, skip, stats, stop=None):
+    found = np.zeros(x.shape, dtype=bool)
+    wall_type = np.ones(x.shape, dtype=np.uint8)  # default wall type if nothing is found
+
+    # how many tiles one step moves every ray (along the axis it moves most on)
+    reach = np.maximum(np.abs(step_x), np.abs(step_y)) / TILESIZE
+
+    inside = map.contains(x, y)
+    if stop is not None:
+        inside &= stop >= 0
+        taken = np.zeros(x.shape)
+    active = np.flatnonzero(inside)
+    while active.size:
+        stats[0] += 1
+        stats[1] += active.size
+
+        if skip:
+            clearance = map.clearance_at(x[active], y[active])
+            hit = clearance == 0
+        else:
+            types = map.wall_types_at(x[active], y[active])
+            hit = types != 0
+
+        hits = active[hit]
+        found[hits] = True
+        wall_type[hits] = map.wall_types_at(x[hits], y[hits]) if skip else types[hit]
+
+        # only the rays that are still in open space take another step
+        active = active[~hit]
+        if skip:
+            # (shrunk a hair so float rounding can never jump onto the first tile outside the box)
+            steps = ((clearance[~hit] - 1) * 0.999999) // reach[active] + 1
+            x[active] += steps * step_x[active]
+            y[active] += steps * step_y[active]
+        else:
+            steps = 1
+            x[active] += step_x[active]
+            y[active] += step_y[active]
+        if stop is not None:
+            taken[active] += steps
+            active = active[taken[active] <= stop[active]]
+        active = active[map.contains(x[active], y[active])]
+
+    return found, wall_type
+
+
+# the horizontal and the vertical pass for rays from (origin_x, origin_y) (one point or one per
+# ray) along (dir_x, dir_y). Returns (found, x, y, wall type, distance) of the closest row
+# boundary and of the closest column boundary with a wall, where the distances are only valid
+# for the rays that found one. With max_distance (per ray or for all of them, dir_x and dir_y
+# have to be unit vectors then) the rays don't look for walls any farther than that
+def _cast(map, origin_x, origin_y, dir_x, dir_y, skip, stats, max_distance=None):
+    facing_down = dir_y > 0
+    facing_right = dir_x > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tan = dir_y / dir_x
+
+        # HORIZONTAL CHECKING
+        row_y = (origin_y // TILESIZE) * TILESIZE
+        horizontal_y = np.where(facing_down, row_y + TILESIZE, row_y - 0.01)
+        horizontal_x = origin_x + (horizontal_y - origin_y) / tan
+
+        ya = np.where(facing_down, TILESIZE, -TILESIZE).astype(np.float64)
+        xa = ya / tan
+
+        # (the first boundary is |horizontal_y - origin_y| / |dir_y| away, every step adds TILESIZE / |dir_y|)
+        stop = None
+        if max_distance is not None:
+            stop = np.floor((max_distance * np.abs(dir_y) - np.abs(horizontal_y - origin_y)) / TILESIZE)
+        found_horizontal, horizontal_type = _march(map, horizontal_x, horizontal_y, xa, ya, skip, stats, stop)
+
+        # VERTICAL CHECKING
+        column_x = (origin_x // TILESIZE) * TILESIZE
+        vertical_x = np.where(facing_right, column_x + TILESIZE, column_x - 0.01)
+        vertical_y = origin_y + (vertical_x - origin_x) * tan
+
+        xa = np.where(facing_right, TILESIZE, -TILESIZE).astype(np.float64)
+        ya = xa * tan
+
+        stop = None
+        if max_distance is not None:
+            stop = np.floor((max_distance * np.abs(dir_x) - np.abs(vertical_x - origin_x)) / TILESIZE)
+        found_vertical, vertical_type = _march(map, vertical_x, vertical_y, xa, ya, skip, stats, stop)
+
+        # DISTANCE CALCULATION
+        dx = horizontal_x - origin_x
+        dy = horizontal_y - origin_y
+        horizontal_distance = np.sqrt(dx * dx + dy * dy)
+        dx = vertical_x - origin_x
+        dy = vertical_y - origin_y
+        vertical_distance = np.sqrt(dx * dx + dy * dy)
+
+    return (
+        (found_horizontal, horizontal_x, horizontal_y, horizontal_type, horizontal_distance),
+        (found_vertical, vertical_x, vertical_y, vertical_type, vertical_distance),
+    )
+
+
+# casts one ray per (dir_x, dir_y) pair from the point (origin_x, origin_y) and writes the
+# distance along the ray (into length), the hit coordinates, whether the hit was on a vertical
+# grid line and the wall type that was hit into the RayBuffer `out`.
+# returns how many lock-step passes the casting took and how many grid lookups the rays made
+def cast_rays(map, origin_x, origin_y, dir_x, dir_y, out, skip=SKIP_EMPTY_SPACE):
+    stats = [0, 0]
+    horizontal, vertical = _cast(map, origin_x, origin_y, dir_x, dir_y, skip, stats)
+    found_horizontal, horizontal_x, horizontal_y, horizontal_type, horizontal_distance = horizontal
+    found_vertical, vertical_x, vertical_y, vertical_type, vertical_distance = vertical
+
+    # (999 for the passes that found nothing, like Ray.cast)
+    horizontal_distance[~found_horizontal] = 999
+    vertical_distance[~found_vertical] = 999
+
+    hit_vertical = out.hit_vertical
+    np.greater_equal(horizontal_distance, vertical_distance, out=hit_vertical)
+
+    np.copyto(out.length, horizontal_distance)
+    np.copyto(out.length, vertical_distance, where=hit_vertical)
+    np.copyto(out.hit_x, horizontal_x)
+    np.copyto(out.hit_x, vertical_x, where=hit_vertical)
+    np.copyto(out.hit_y, horizontal_y)
+    np.copyto(out.hit_y, vertical_y, where=hit_vertical)
+    np.copyto(out.wall_type, horizontal_type)
+    np.copyto(out.wall_type, vertical_type, where=hit_vertical)
+
+    return stats
+
+
+# casts one ray per element of the arrays, every one from its own origin along its own
+# direction (unit vectors), and looks for walls up to max_distance pixels along it (one distance
+# or one per ray, single values count as one ray). Returns (hit, hit_x, hit_y, distance, wall_type) arrays: whether the ray hit a
+# wall within that distance, the point where it did and how far that is. Rays that hit nothing
+# end after max_distance, with wall type 0.
+def trace_rays(map, origin_x, origin_y, dir_x, dir_y, max_distance=np.inf, skip=SKIP_EMPTY_SPACE, stats=None):
+    # (the passes update their arrays in place, so single values become arrays of one ray too)
+    origin_x, origin_y, dir_x, dir_y, max_distance = (
+        np.array(a, dtype=np.float64)
+        for a in np.broadcast_arrays(*np.atleast_1d(origin_x, origin_y, dir_x, dir_y, max_distance))
+    )
+    horizontal, vertical = _cast(map, origin_x, origin_y, dir_x, dir_y, skip, stats or [0, 0], max_distance)
+    found_horizontal, horizontal_x, horizontal_y, horizontal_type, horizontal_distance = horizontal
+    found_vertical, vertical_x, vertical_y, vertical_type, vertical_distance = vertical
+
+    horizontal_distance[~found_horizontal] = np.inf
+    vertical_distance[~found_vertical] = np.inf
+    hit_vertical = horizontal_distance >= vertical_distance
+    hit = found_horizontal | found_vertical
+
+    distance = np.where(hit_vertical, vertical_distance, horizontal_distance)
+    hit_x = np.where(hit_vertical, vertical_x, horizontal_x)
+    hit_y = np.where(hit_vertical, vertical_y, horizontal_y)
+    wall_type = np.where(hit_vertical, vertical_type, horizontal_type)
+
+    # the misses end at max_distance
+    miss = ~hit
+    distance[miss] = max_distance[miss]
+    with np.errstate(invalid="ignore"):
+        hit_x[miss] = origin_x[miss] + dir_x[miss] * max_distance[miss]
+        hit_y[miss] = origin_y[miss] + dir_y[miss] * max_distance[miss]
+    wall_type[miss] = 0
+
+    return hit, hit_x, hit_y, distance, wall_type
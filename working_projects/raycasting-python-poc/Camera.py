@@ -0,0 +1,69 @@
+import math
+import numpy as np
+from settings import *
+
+# Per-column tables of the camera. Everything that only depends on FOV, the number of rays
+# and the window width (angle offsets, ray directions, fisheye correction, screen x of the
+# columns) is computed once in configure(). Every frame only the player's rotation is
+# applied, with one sin/cos for the whole frame instead of trig for every column.
+class Camera:
+    def __init__(self, fov=FOV, num_rays=NUM_RAYS, width=WINDOW_WIDTH):
+        self.fov = None
+        self.num_rays = None
+        self.width = None
+        self.configure(fov, num_rays, width)
+
+    # rebuilds the tables, but only if one of the settings actually changed
+    def configure(self, fov, num_rays, width):
+        if (fov, num_rays, width) == (self.fov, self.num_rays, self.width):
+            return
+        self.fov = fov
+        self.num_rays = num_rays
+        self.width = width
+
+        columns = np.arange(num_rays)
+
+        # angle of every column relative to the player's rotation, computed from the
+        # column index so it doesn't drift like an accumulated angle would
+        self.offsets = columns * (fov / num_rays) - fov / 2
+
+        # ray directions for a player looking at angle 0
+        self.column_dir_x = np.cos(self.offsets)
+        self.column_dir_y = np.sin(self.offsets)
+
+        # cos(rotationAngle - rayAngle) is just cos(-offset), so it never changes
+        self.fisheye = np.cos(self.offsets)
+
+        self.column_width = width / num_rays
+        self.column_x = (columns * self.column_width).astype(np.intp)
+
+        # whole pixels from every column to the next one, and the column every pixel of the
+        # screen belongs to, for drawing the columns as wide as they are
+        self.column_widths = np.diff(self.column_x, append=width)
+        self.screen_columns = np.repeat(columns, self.column_widths)
+
+        # output arrays, reused every frame
+        self.dir_x = np.empty(num_rays)
+        self.dir_y = np.empty(num_rays)
+        self._scratch = np.empty(num_rays)
+
+    # rotates the column directions by the player's rotation (a 2d rotation matrix)
+    def rotate(self, rotation):
+        c = math.cos(rotation)
+        s = math.sin(rotation)
+
+        np.multiply(self.column_dir_x, c, out=self.dir_x)
+        np.multiply(self.column_dir_y, s, out=self._scratch)
+        self.dir_x -= self._scratch
+
+        np.multiply(self.column_dir_x, s, out=self.dir_y)
+        np.multiply(self.column_dir_y, c, out=self._scratch)
+        self.dir_y += self._scratch
+
+        return self.dir_x, self.dir_y
+
+    # writes the absolute (normalized) angle of every column into `out`
+    def angles(self, rotation, out):
+        np.add(self.offsets, rotation, out=out)
+        out %= 2 * math.pi
+        return out
@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from settings import *
+from Player import Player
+from Raycaster import Raycaster
+
+
+# Casts the next frame while the current one is drawn. A background thread has a Raycaster of
+# its own (sharing the textures and the column cache of the one everything draws from, it
+# never draws) that casts for a copy of the player's pose. Every frame cast() swaps the ray
+# buffer it cast into during the last frame with the one that was drawn from, and hands the
+# thread the pose for the next frame: the thread only ever writes its buffer, the renderers
+# only ever read the other one. The swap needs no lock, the thread is waiting for the next
+# pose while it happens. The casting runs in
+# NumPy (and the blits and the present in SDL) with the GIL released, so on more than one
+# core it overlaps with drawing.
+#
+# The price is a frame of latency: every frame shows the pose of the frame before. To keep the
+# picture consistent the raycaster's player is swapped for that pose too (so the sprites and
+# the floor are drawn from where the walls were cast), the real player only moves the next
+# cast. `latency` is how old the pose of the last frame was when it was drawn, without the
+# pipeline that's only the time casting takes.
+class CastPipeline:
+    def __init__(self, raycaster):
+        self.raycaster = raycaster
+        self.player = raycaster.player
+
+        # the pose the thread casts for and the one that is shown
+        self.pose = Player(self.player.x, self.player.y)
+        self.view = Player(self.player.x, self.player.y)
+        raycaster.player = self.view
+
+        # the casting workers (if any) work for the thread now
+        self.caster = Raycaster(self.pose, raycaster.map, workers=0, atlas=raycaster.atlas, columns=raycaster.columns)
+        self.caster.parallel, raycaster.parallel = raycaster.parallel, None
+
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.pending = False
+
+        # when the pending cast was handed to the thread, seconds it took, seconds the last
+        # frame waited for it and how old its rays were
+        self.submitted = 0.0
+        self.elapsed = 0.0
+        self.waited = 0.0
+        self.latency = 0.0
+
+    def _run(self):
+        while self.requests.get():
+            began = time.perf_counter()
+            try:
+                self.caster.castAllRays()
+                self.results.put(time.perf_counter() - began)
+            except BaseException as error:
+                self.results.put(error)
+
+    def _submit(self, res):
+        player = self.player
+        self.pose.x, self.pose.y, self.pose.rotationAngle = player.x, player.y, player.rotationAngle
+        self.caster.set_resolution(res)
+        self.submitted = time.perf_counter()
+        self.requests.put(True)
+        self.pending = True
+
+    def _wait(self):
+        result = self.results.get()
+        self.pending = False
+        if isinstance(result, BaseException):
+            raise result
+        self.elapsed = result
+
+    # the raycaster's rays become the ones cast for the last frame's pose, and the pose the
+    # player has now is cast in the background. The very first frame is cast right away
+    def cast(self):
+        raycaster = self.raycaster
+        caster = self.caster
+
+        # (the resolution the next frame is asked for, set_resolution may have been called on the raycaster)
+        res = raycaster.res
+
+        began = time.perf_counter()
+        if not self.pending:
+            self._submit(res)
+        self._wait()
+        taken = time.perf_counter()
+        self.waited = taken - began
+
+        # (the first frame is cast right away, for it this is just the time the cast took)
+        self.latency = taken - self.submitted
+
+        if caster.parallel:
+            # the workers cast into their shared memory, which they will write again while this
+            # frame is drawn
+            raycaster.rays.assign(caster.rays)
+            raycaster.pose = caster.pose
+        else:
+            # every buffer keeps the pose it was cast for, so the thread can reuse the rays of
+            # the buffer it gets back
+            raycaster.rays, caster.rays = caster.rays, raycaster.rays
+            raycaster.pose, caster.pose = caster.pose, raycaster.pose
+        raycaster.camera.configure(caster.camera.fov, caster.num_rays, caster.camera.width)
+        raycaster.res, raycaster.num_rays = caster.res, caster.num_rays
+        raycaster.cast_stats, raycaster.reused = caster.cast_stats, caster.reused
+        self.view.x, self.view.y, self.view.rotationAngle = self.pose.x, self.pose.y, self.pose.rotationAngle
+
+        self._submit(res)
+
+    # waits for the last cast and stops the thread (and the casting workers)
+    def close(self):
+        if self.pending:
+            self._wait()
+        self.requests.put(False)
+        self.thread.join()
+        self.caster.close()
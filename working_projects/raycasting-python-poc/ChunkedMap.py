@@ -0,0 +1,214 @@
+import mmap
+import struct
+import threading
+import numpy as np
+from settings import *
+from Map import Map, _clearance
+
+# .rcworld file layout: a header, the index (the number of the block every chunk uses, row by
+# row of chunks) and the blocks (chunk x chunk tiles each, row by row, one byte per tile).
+# Chunks with the same tiles can share a block, so worlds built from a limited set of chunks
+# stay small on disk however big they are
+WORLD_MAGIC = b"RCWD"
+WORLD_VERSION = 1
+WORLD_HEADER = struct.Struct("<4sBxHIII12x")  # magic, version, chunk size, cols, rows, blocks
+
+
+# writes a world of cols x rows tiles: blocks is a (count, chunk, chunk) array of the distinct
+# chunks and index a (chunk rows, chunk cols) array with the block of every chunk
+def write_world(path, cols, rows, blocks, index):
+    blocks = np.ascontiguousarray(blocks, dtype=np.uint8)
+    chunk = blocks.shape[1]
+    if index.shape != (-(-rows // chunk), -(-cols // chunk)):
+        raise ValueError(f"a world of {cols}x{rows} tiles has {-(-cols // chunk)}x{-(-rows // chunk)} chunks of {chunk}")
+    with open(path, "wb") as f:
+        f.write(WORLD_HEADER.pack(WORLD_MAGIC, WORLD_VERSION, chunk, cols, rows, len(blocks)))
+        f.write(np.ascontiguousarray(index, dtype="<u4").tobytes())
+        f.write(blocks.tobytes())
+
+
+# splits a grid into chunks (the tiles past its edges are walls) and returns the distinct ones
+# and the index, see write_world
+def chunk_grid(grid, chunk=WORLD_CHUNK):
+    rows, cols = grid.shape
+    chunk_rows, chunk_cols = -(-rows // chunk), -(-cols // chunk)
+    padded = np.ones((chunk_rows * chunk, chunk_cols * chunk), dtype=np.uint8)
+    padded[:rows, :cols] = grid
+    chunks = padded.reshape(chunk_rows, chunk, chunk_cols, chunk).swapaxes(1, 2).reshape(-1, chunk * chunk)
+    blocks, index = np.unique(chunks, axis=0, return_inverse=True)
+    return blocks.reshape(-1, chunk, chunk), index.reshape(chunk_rows, chunk_cols)
+
+
+# A Map on top of a .rcworld file, for worlds far too big to keep in memory. The file is
+# mapped into memory, not read: only the chunks the rays, the minimap or the game logic
+# actually touch are paged in, into a fixed pool of slots (at most cache_bytes of tiles and
+# their clearance). When the pool is full the least recently used chunk is evicted.
+#
+# The clearance of a chunk is worked out when it is paged in, from its own tiles only (as if
+# it was walled in), so it never needs its neighbours. Rays skip a little less near chunk
+# edges, but the hits are the same.
+#
+# Lookups take arrays of coordinates like the ones of Map, and a table says where the tiles of
+# every chunk are in the slots, so a whole batch of rays is served with two gathers. The table
+# has a ring of chunks around the world that all share one slot full of walls (the border
+# around a Map), so the lookups need no bounds checks either. The world is read only.
+class ChunkedMap(Map):
+    def __init__(self, path, cache_bytes=WORLD_CACHE_BYTES):
+        self.path = path
+        with open(path, "rb") as f:
+            self.file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, chunk, cols, rows, blocks = WORLD_HEADER.unpack_from(self.file)
+        if magic != WORLD_MAGIC or version != WORLD_VERSION:
+            raise ValueError(f"{path} is not a version {WORLD_VERSION} world file")
+        if chunk < 2 or chunk & (chunk - 1):
+            raise ValueError(f"{path} has chunks of {chunk} tiles, they have to be a power of two")
+
+        self.chunk = chunk
+        self.shift = chunk.bit_length() - 1
+        self.rows = rows
+        self.cols = cols
+        self.chunk_rows = -(-rows // chunk)
+        self.chunk_cols = -(-cols // chunk)
+        self.width = cols * TILESIZE
+        self.height = rows * TILESIZE
+        self.listeners = []
+
+        self.index = np.frombuffer(self.file, dtype="<u4", count=self.chunk_rows * self.chunk_cols, offset=WORLD_HEADER.size)
+        self.blocks_offset = WORLD_HEADER.size + self.index.nbytes
+        if self.index.size and self.index.max(initial=0) >= blocks:
+            raise ValueError(f"{path} has chunks with blocks it doesn't have")
+
+        # the slots: tiles and clearance of the resident chunks and the wall slot after them.
+        # Both are kept flat with one element in front, see base_of
+        slots = max(1, cache_bytes // (2 * chunk * chunk))
+        self.flat_tiles = np.zeros(1 + (slots + 1) * chunk * chunk, dtype=np.uint8)
+        self.flat_clearance = np.zeros(1 + (slots + 1) * chunk * chunk, dtype=np.uint8)
+        self.chunk_tiles = self.flat_tiles[1:].reshape(slots + 1, chunk, chunk)
+        self.chunk_clearance = self.flat_clearance[1:].reshape(slots + 1, chunk, chunk)
+        self.chunk_tiles[slots] = 1
+        self.wall_slot = slots
+
+        # every chunk of the world and of the ring around it has an entry in the table. For a
+        # resident chunk it is where the tile (row, col) of the world is in the flat slots, less
+        # row * chunk + col, so a lookup only adds those: it is a multiple of chunk and with the
+        # element in front it's never 0 for a resident chunk. The ring chunks are pointed at the
+        # wall slot when something gets there. The table and the last time every chunk was used
+        # start out as zero pages that cost no memory until they are written
+        self.table_cols = self.chunk_cols + 2
+        self.base_of = np.zeros((self.chunk_rows + 2) * self.table_cols, dtype=np.int64)
+        self.last_used = np.zeros(len(self.base_of), dtype=np.int64)
+        self.clock = 0
+
+        # the chunk in every slot (-1 for free ones) and how many are free
+        self.chunk_of = np.full(slots, -1, dtype=np.intp)
+        self.free = slots
+
+        # the casting thread (see CastPipeline) and the game share the slots
+        self.lock = threading.Lock()
+
+        # chunks paged in and evicted so far
+        self.loads = 0
+        self.evictions = 0
+
+    # the entries of base_of of an array of chunks, paging in the ones that aren't resident
+    def _bases(self, ids):
+        self.clock += 1
+        bases = self.base_of.take(ids)
+        if not bases.all():
+            # the chunks this lookup needs must not be evicted to make room for each other
+            self.last_used.put(ids, self.clock)
+            for chunk_id in np.unique(ids[bases == 0]).tolist():
+                self._page_in(chunk_id)
+            bases = self.base_of.take(ids)
+        self.last_used.put(ids, self.clock)
+        return bases
+
+    def _page_in(self, chunk_id):
+        chunk = self.chunk
+        chunk_row, chunk_col = divmod(chunk_id, self.table_cols)
+        chunk_row -= 1
+        chunk_col -= 1
+        if 0 <= chunk_row < self.chunk_rows and 0 <= chunk_col < self.chunk_cols:
+            slot = self._evict()
+            offset = self.blocks_offset + int(self.index[chunk_row * self.chunk_cols + chunk_col]) * chunk * chunk
+            tiles = self.chunk_tiles[slot]
+            tiles[:] = np.frombuffer(self.file, dtype=np.uint8, count=chunk * chunk, offset=offset).reshape(chunk, chunk)
+
+            # the tiles of the last chunks past the edges of the world are walls, like the border around a Map
+            tiles[self.rows - chunk_row * chunk :] = 1
+            tiles[:, self.cols - chunk_col * chunk :] = 1
+
+            cells = np.ones((chunk + 2, chunk + 2), dtype=np.uint8)
+            cells[1:-1, 1:-1] = tiles
+            self.chunk_clearance[slot] = _clearance(cells)[1:-1, 1:-1]
+
+            self.chunk_of[slot] = chunk_id
+            self.loads += 1
+        else:
+            slot = self.wall_slot
+
+        self.base_of[chunk_id] = 1 + slot * chunk * chunk - chunk_row * chunk * chunk - chunk_col * chunk
+        self.last_used[chunk_id] = self.clock
+
+    # a free slot, or the one of the least recently used chunk
+    def _evict(self):
+        if self.free:
+            self.free -= 1
+            return self.free
+
+        slot = int(np.argmin(self.last_used[self.chunk_of]))
+        evicted = self.chunk_of[slot]
+        if self.last_used[evicted] == self.clock:
+            raise ValueError(f"one lookup touches more than the {len(self.chunk_of)} chunks WORLD_CACHE_BYTES holds")
+        self.base_of[evicted] = 0
+        self.evictions += 1
+        return slot
+
+    # values of `flat` (tiles or clearance) at arrays of pixel coordinates that are inside the
+    # map (see contains)
+    def _lookup(self, flat, xs, ys):
+        # (the same tiles as xs // TILESIZE for the power of two TILESIZE, a lot faster on big
+        # arrays)
+        col = np.floor(xs * (1 / TILESIZE)).astype(np.intp)
+        row = np.floor(ys * (1 / TILESIZE)).astype(np.intp)
+
+        # the chunks in the table (the shifts floor, the tiles of the border are in the ring)
+        shift = self.shift
+        ids = (row >> shift) * self.table_cols
+        ids += col >> shift
+        ids += self.table_cols + 1
+        with self.lock:
+            index = self._bases(ids)
+            index += row << shift
+            index += col
+            return flat.take(index)
+
+    def wall_type_at(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return 1
+        return int(self._lookup(self.flat_tiles, np.array([x]), np.array([y]))[0])
+
+    def wall_types_at(self, xs, ys):
+        return self._lookup(self.flat_tiles, xs, ys)
+
+    def clearance_at(self, xs, ys):
+        return self._lookup(self.flat_clearance, xs, ys)
+
+    def region(self, first_row, first_col, rows, cols):
+        tile_rows, tile_cols = np.mgrid[first_row : first_row + rows, first_col : first_col + cols]
+        return self._lookup(self.flat_tiles, (tile_cols + 0.5) * TILESIZE, (tile_rows + 0.5) * TILESIZE)
+
+    # the empty tiles of the chunks around the center of the world, the rest of it is paged in
+    # only when somebody gets there
+    def empty_tiles(self, radius=2):
+        size = (2 * radius + 1) * self.chunk
+        first_row = max(self.rows // 2 - size // 2, 0)
+        first_col = max(self.cols // 2 - size // 2, 0)
+        tiles = self.region(first_row, first_col, min(size, self.rows), min(size, self.cols))
+        return np.argwhere(tiles == 0) + (first_row, first_col)
+
+    def set_tile(self, col, row, value):
+        raise ValueError(f"{self.path} is read only")
+
+    def save(self, path, compress=True):
+        raise ValueError("a chunked world can't be saved as a map file")
@@ -0,0 +1,43 @@
+import time
+from settings import *
+
+
+# Fixed timestep for the game logic. The simulation advances in ticks of 1 / rate seconds no
+# matter how fast frames are drawn: every frame the time it took is added to an accumulator
+# and a tick is run for every whole tick in it. What is left over (`alpha`, 0 to 1 of a tick)
+# says how far the frame is between the last two ticks, drawing the pose interpolated by that
+# much keeps the motion smooth when the frame rate and the tick rate don't match. After a
+# very slow frame at most max_ticks are run, the rest of the time is dropped instead of
+# making the next frame slower still.
+class FixedTimestep:
+    def __init__(self, rate=TICK_RATE, max_ticks=MAX_TICKS_PER_FRAME):
+        self.rate = rate
+        self.dt = 1 / rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.last = None
+
+        # ticks run so far and ticks dropped after slow frames
+        self.ticks = 0
+        self.dropped = 0
+
+    # adds `seconds` (by default the time since the last call) and returns how many ticks to run now
+    def advance(self, seconds=None):
+        if seconds is None:
+            now = time.perf_counter()
+            seconds = now - self.last if self.last is not None else 0.0
+            self.last = now
+        self.accumulator += seconds
+
+        ticks = int(self.accumulator / self.dt)
+        self.accumulator -= ticks * self.dt
+        if ticks > self.max_ticks:
+            self.dropped += ticks - self.max_ticks
+            ticks = self.max_ticks
+        self.ticks += ticks
+        return ticks
+
+    # how far the time is past the last tick, as a fraction of a tick
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
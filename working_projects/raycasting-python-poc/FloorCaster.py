@@ -0,0 +1,115 @@
+import time
+import numpy as np
+import pygame
+from settings import *
+from ShadeTable import shade_levels, shaded_copies
+
+# eye height over the floor in pixels: the walls are TILESIZE high and centered on the horizon
+EYE_HEIGHT = TILESIZE / 2
+
+# distance from the eye to the projection plane, the same 415 the wall heights use
+PROJECTION_DISTANCE = 415
+
+
+# generated floor and ceiling tiles (the size of a wall texture), for when no image is set
+def default_texture(color, grout):
+    size = 64
+    surface = pygame.Surface((size, size))
+    surface.fill(color)
+    for i in range(0, size, size // 2):
+        pygame.draw.line(surface, grout, (0, i), (size, i), 2)
+        pygame.draw.line(surface, grout, (i, 0), (i, size), 2)
+    return surface
+
+
+# Textured floor and ceiling. The walls are centered on the horizon, so a screen row p pixels
+# below it sees the floor at the same distance (along the view direction) in every column,
+# and the row p pixels above it sees the ceiling at that distance. Every frame the world
+# position of every (column, row) is computed at once from the camera's column directions
+# and those row distances, and both textures are sampled there in one gather each. The
+# distance also picks the shade level, like for the walls.
+class FloorCaster:
+    def __init__(self, raycaster, width=WINDOW_WIDTH, height=WINDOW_HEIGHT, floor=FLOOR_TEXTURE, ceiling=CEILING_TEXTURE):
+        self.raycaster = raycaster
+        self.width = width
+        self.height = height
+
+        # pixels are mapped to the format of this surface, like in the FrameRenderer
+        self.surface = pygame.Surface((width, height), depth=32)
+        self.pixels = np.zeros((width, height), dtype=np.uint32)
+
+        floor = pygame.image.load(floor).convert() if floor else default_texture((90, 90, 90), (60, 60, 60))
+        ceiling = pygame.image.load(ceiling).convert() if ceiling else default_texture((50, 50, 70), (35, 35, 50))
+        if ceiling.get_size() != floor.get_size():
+            ceiling = pygame.transform.scale(ceiling, floor.get_size())
+        self.texture_width, self.texture_height = floor.get_size()
+
+        # the pixels of all the shade levels of both textures, flattened so that a pixel is
+        # sampled with one index: (level * texture_width + x) * texture_height + y
+        self.floor = self._stack(floor).ravel()
+        self.ceiling = self._stack(ceiling).ravel()
+
+        # distance to the floor seen by every row under the horizon (from the center of the row)
+        self.horizon = height // 2
+        rows = np.arange(height - self.horizon) + 0.5
+        self.row_distance = EYE_HEIGHT * PROJECTION_DISTANCE / rows
+
+        # shade level of every row, the same depth shading as a vertical wall at that distance,
+        # as the offset of its pixels in the flattened textures
+        shade = np.clip(255 * 60 / self.row_distance, 0, 255)
+        self.row_offsets = shade_levels(shade) * (self.texture_width * self.texture_height)
+
+        # floor and ceiling of every ray column, reused every frame
+        self.background = np.zeros((0, height), dtype=np.uint32)
+
+        # seconds the last cast took
+        self.elapsed = 0.0
+
+    # the shade levels of a texture as one (shade level, x, y) array of mapped pixels (the
+    # dtype of the background)
+    def _stack(self, texture):
+        return np.stack([pygame.surfarray.array2d(shaded.convert(self.surface)) for shaded in shaded_copies(texture)]).astype(np.uint32)
+
+    # floor and ceiling pixels of every ray column as a (num_rays, height) array, the rows
+    # the walls cover are filled too
+    def cast(self):
+        began = time.perf_counter()
+        player = self.raycaster.player
+        camera = self.raycaster.camera
+        if len(self.background) != camera.num_rays:
+            self.background = np.zeros((camera.num_rays, self.height), dtype=np.uint32)
+
+        # world position seen by every (column, floor row), in texture pixels (one texture per
+        # tile). The row distance is measured along the view direction, so along a column's
+        # ray it is divided by the fisheye factor
+        dir_x, dir_y = camera.rotate(player.rotationAngle)
+        scale_x = self.texture_width / TILESIZE
+        scale_y = self.texture_height / TILESIZE
+        along = self.row_distance[None, :] / camera.fisheye[:, None]
+        u = ((dir_x * scale_x)[:, None] * along + player.x * scale_x).astype(np.intp)
+        v = ((dir_y * scale_y)[:, None] * along + player.y * scale_y).astype(np.intp)
+        u %= self.texture_width
+        v %= self.texture_height
+
+        # index of the pixel in the flattened textures
+        u *= self.texture_height
+        u += v
+        u += self.row_offsets
+
+        floor = self.background[:, self.horizon :]
+        np.take(self.floor, u, out=floor, mode="clip")
+        # the ceiling rows mirror the floor rows around the horizon
+        if self.horizon:
+            np.take(self.ceiling, u[:, : self.horizon], out=self.background[:, self.horizon - 1 :: -1], mode="clip")
+
+        self.elapsed = time.perf_counter() - began
+        return self.background
+
+    # draws the floor and ceiling over the whole screen, for the renderers that draw the walls on top
+    def render(self, screen):
+        background = self.cast()
+        began = time.perf_counter()
+        self.pixels[:] = background[self.raycaster.camera.screen_columns]
+        pygame.surfarray.blit_array(self.surface, self.pixels)
+        screen.blit(self.surface, (0, 0))
+        self.elapsed += time.perf_counter() - began
@@ -0,0 +1,93 @@
+import pygame
+import numpy as np
+from settings import *
+from ShadeTable import shaded_copies
+from MipMap import mip_chain, mip_x
+
+# Alternative to Raycaster.render that draws the whole 3D view (walls, ceiling and floor)
+# into one reusable NumPy pixel buffer and puts it on the screen with a single blit.
+# Texture sampling is a vectorized gather from the stacked texture pixels, driven by the
+# texture_x and line_height the Raycaster leaves in its RayBuffer.
+class FrameRenderer:
+    # floors is an optional FloorCaster, without one the floor and ceiling are flat colors
+    def __init__(self, raycaster, width=WINDOW_WIDTH, height=WINDOW_HEIGHT, floors=None):
+        self.raycaster = raycaster
+        self.floors = floors
+        self.width = width
+        self.height = height
+
+        # the frame is built from pixel values already mapped to the format of this surface,
+        # so every pixel is a single 32 bit integer instead of three color channels
+        self.surface = pygame.Surface((width, height), depth=32)
+
+        # pixels of every mip level of every shade level of every texture as one (texture id,
+        # shade level, mip level, x, y) array, mip level m fills the top-left corner of its
+        # slot. Textures that don't have the size of texture 1 are scaled to it
+        textures = raycaster.WALL_TEXTURES
+        self.texture_width, self.texture_height = textures[1].get_size()
+        self.textures = None
+        for texture_id, texture in textures.items():
+            if texture.get_size() != (self.texture_width, self.texture_height):
+                texture = pygame.transform.scale(texture, (self.texture_width, self.texture_height))
+            chain = mip_chain(texture)
+            if self.textures is None:
+                self.mip_widths = np.array([mip.get_width() for mip in chain], dtype=np.intp)
+                self.mip_heights = np.array([mip.get_height() for mip in chain], dtype=np.intp)
+                self.textures = np.zeros(
+                    (max(textures) + 1, SHADE_LEVELS, len(chain), self.texture_width, self.texture_height), dtype=np.uint32
+                )
+            for mip, level_mip in enumerate(chain):
+                for level, shaded in enumerate(shaded_copies(level_mip)):
+                    self.textures[texture_id, level, mip, : level_mip.get_width(), : level_mip.get_height()] = (
+                        pygame.surfarray.array2d(shaded.convert(self.surface))
+                    )
+
+        # pygame.surfarray indexes pixels as [x, y]
+        self.pixels = np.zeros((width, height), dtype=np.uint32)
+
+        self.rows = np.arange(height)
+
+        # color of every screen row where there is no wall
+        self.background = np.empty(height, dtype=np.uint32)
+        self.background[: height // 2] = self.surface.map_rgb(CEILING_COLOR)
+        self.background[height // 2 :] = self.surface.map_rgb(FLOOR_COLOR)
+
+    def render(self, screen):
+        rays = self.raycaster.rays
+        camera = self.raycaster.camera
+
+        # same placement Raycaster.render uses: the scaled column is int(line_height) pixels tall
+        # and its top row is at int(draw_begin)
+        heights = rays.line_height.astype(np.intp)
+        np.maximum(heights, 1, out=heights)
+        draw_begin = ((self.height / 2) - (rays.line_height / 2)).astype(np.intp)
+
+        # size of the mip level every column is drawn from
+        mips = np.minimum(rays.mip, len(self.mip_heights) - 1)
+        mip_heights = self.mip_heights[mips][:, None]
+        texture_x = mip_x(rays.texture_x, self.texture_width, self.mip_widths[mips])
+
+        # texture row sampled by every screen row of every column (nearest neighbour)
+        texture_y = ((self.rows[None, :] - draw_begin[:, None]) * mip_heights) // heights[:, None]
+        is_wall = (texture_y >= 0) & (texture_y < mip_heights)
+        np.clip(texture_y, 0, mip_heights - 1, out=texture_y)
+
+        texture_ids = self.raycaster.texture_ids[rays.wall_type]
+        columns = self.textures[
+            texture_ids[:, None], rays.shade_level[:, None], mips[:, None], texture_x[:, None], texture_y
+        ]
+        background = self.floors.cast() if self.floors else self.background
+        columns = np.where(is_wall, columns, background)
+
+        if self.raycaster.stretch:
+            self.pixels[:] = columns[camera.screen_columns]
+        else:
+            # the floor fills the gaps between the 1 pixel columns
+            if self.floors:
+                self.pixels[:] = background[camera.screen_columns]
+            else:
+                self.pixels.fill(self.surface.map_rgb((0, 0, 0)))
+            self.pixels[camera.column_x] = columns
+
+        pygame.surfarray.blit_array(self.surface, self.pixels)
+        screen.blit(self.surface, (0, 0))
@@ -0,0 +1,42 @@
+import json
+from settings import *
+
+
+# The controls (turnDirection, moveDirection) of every game logic tick of a session. The game
+# logic only changes in ticks (see FixedTimestep) and every tick only depends on the pose
+# before it and its controls, so a session played back from its log takes exactly the same
+# path, however fast or slow the frames are drawn. Logs are JSON files like
+#   {"map": null, "tick_rate": 60, "start": [x, y, rotationAngle], "controls": [[1, 0], ...]}
+# with the map file the session was played on (None for the built-in map) and the player's
+# pose before the first tick (None for the map's spawn point); files with only the controls
+# load too.
+class InputLog:
+    def __init__(self, controls=(), map_file=MAP_FILE, tick_rate=TICK_RATE, start=None):
+        self.controls = [tuple(pair) for pair in controls]
+        self.map_file = map_file
+        self.tick_rate = tick_rate
+        self.start = tuple(start) if start else None
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["controls"], data.get("map"), data.get("tick_rate", TICK_RATE), data.get("start"))
+
+    def save(self, path):
+        data = {"map": self.map_file, "tick_rate": self.tick_rate, "start": self.start, "controls": self.controls}
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    # puts the player at the start of the session
+    def place(self, player):
+        if self.start:
+            player.x, player.y, player.rotationAngle = self.start
+            player.previous = self.start
+
+    def record(self, controls):
+        self.controls.append(tuple(controls))
+
+    # the controls of a tick, None when the log is over
+    def replay(self, tick):
+        return self.controls[tick] if tick < len(self.controls) else None
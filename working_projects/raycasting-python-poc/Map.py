@@ -1,39 +1,226 @@
+import math
+import struct
+import zlib
 import pygame
+import numpy as np
 from settings import *
+from BatchCaster import trace_rays
+
+DEFAULT_GRID = [
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
+    [1, 0, 0, 1, 0, 0, 0, 1, 1, 1, 0, 1, 0, 0, 1],
+    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0, 1],
+    [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+]
+
+# .rcmap file layout: a small header followed by one byte per tile, row by row,
+# optionally zlib compressed
+MAP_MAGIC = b"RCMP"
+MAP_VERSION = 1
+MAP_HEADER = struct.Struct("<4sBBII")  # magic, version, compressed, cols, rows
+
 
 class Map:
-    def __init__(self):
-        self.grid = [
-            [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-            [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-            [1, 0, 0, 1, 0, 0, 0, 1, 1, 1, 0, 1, 0, 0, 1],
-            [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            [1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1],
-            [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0, 1],
-            [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+    def __init__(self, grid=DEFAULT_GRID):
+        grid = np.asarray(grid, dtype=np.uint8)
+
+        # the grid is stored in a contiguous uint8 array with a solid border of one tile
+        # around it, so a ray that is still inside the map extents can never index outside of it
+        cells = np.ones((grid.shape[0] + 2, grid.shape[1] + 2), dtype=np.uint8)
+        cells[1:-1, 1:-1] = grid
+        self.use_cells(cells)
+
+        # called with (col, row) whenever a tile changes, see set_tile
+        self.listeners = []
+
+    # map on top of existing padded cells and clearance arrays (e.g. in shared memory), without copying them
+    @classmethod
+    def from_cells(cls, cells, clearance=None):
+        map = cls.__new__(cls)
+        map.use_cells(cells, clearance)
+        map.listeners = []
+        return map
+
+    # switches the map to other padded cells (and clearance) arrays of the same layout
+    def use_cells(self, cells, clearance=None):
+        self.cells = cells
+
+        # chessboard distance (in tiles, capped at SKIP_DISTANCE_LIMIT) from every tile to the
+        # closest wall: a tile with clearance c has no wall within c - 1 tiles around it, so rays
+        # can skip through that box in one jump (see BatchCaster)
+        self.clearance = clearance if clearance is not None else _clearance(cells)
+        self.rows = cells.shape[0] - 2
+        self.cols = cells.shape[1] - 2
+
+        # view of the grid without the border, grid[row][col] works like the old list of lists
+        self.grid = self.cells[1:-1, 1:-1]
+
+        # size of the map in pixels
+        self.width = self.cols * TILESIZE
+        self.height = self.rows * TILESIZE
+
+    # loads a .rcmap file, or opens a .rcworld file as a ChunkedMap
+    @classmethod
+    def load(cls, path):
+        # (imported here, ChunkedMap is built on top of this module)
+        from ChunkedMap import ChunkedMap, WORLD_MAGIC
+
+        with open(path, "rb") as f:
+            magic, version, compressed, cols, rows = MAP_HEADER.unpack(f.read(MAP_HEADER.size))
+            if magic == WORLD_MAGIC:
+                return ChunkedMap(path)
+            if magic != MAP_MAGIC or version != MAP_VERSION:
+                raise ValueError(f"{path} is not a version {MAP_VERSION} map file")
+            data = f.read()
+        if compressed:
+            data = zlib.decompress(data)
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(rows, cols))
+
+    def save(self, path, compress=True):
+        data = np.ascontiguousarray(self.grid).tobytes()
+        if compress:
+            data = zlib.compress(data, 9)
+        with open(path, "wb") as f:
+            f.write(MAP_HEADER.pack(MAP_MAGIC, MAP_VERSION, compress, self.cols, self.rows))
+            f.write(data)
+
+    # (row, col) of the empty tiles, e.g. to put things on
+    def empty_tiles(self):
+        return np.argwhere(self.grid == 0)
+
+    # the tiles of `rows` rows from first_row and `cols` columns from first_col, as an array
+    def region(self, first_row, first_col, rows, cols):
+        return self.grid[first_row : first_row + rows, first_col : first_col + cols]
+
+    # center of the map, or the empty tile closest to it if the center is a wall
+    def spawn_point(self):
+        empty = self.empty_tiles()
+        if len(empty) == 0:
+            return self.width / 2, self.height / 2
+        center = np.array([self.rows / 2, self.cols / 2])
+        row, col = empty[np.argmin(((empty + 0.5 - center) ** 2).sum(axis=1))]
+        return (col + 0.5) * TILESIZE, (row + 0.5) * TILESIZE
+
+    # changes the tile at (col, row) and lets the listeners know
+    def set_tile(self, col, row, value):
+        if self.grid[row, col] == value:
+            return
+        self.grid[row, col] = value
+
+        # only tiles closer than SKIP_DISTANCE_LIMIT to this one can have a different clearance
+        # now, and their clearance only depends on walls that are at most that far away from them
+        limit = SKIP_DISTANCE_LIMIT
+        y, x = row + 1, col + 1  # in padded coordinates
+        top, left = max(y - 2 * limit, 0), max(x - 2 * limit, 0)
+        clearance = _clearance(self.cells[top : y + 2 * limit + 1, left : x + 2 * limit + 1])
+        inner_top, inner_left = max(y - limit, 0), max(x - limit, 0)
+        self.clearance[inner_top : y + limit + 1, inner_left : x + limit + 1] = clearance[
+            inner_top - top : y + limit + 1 - top, inner_left - left : x + limit + 1 - left
         ]
 
+        for listener in self.listeners:
+            listener(col, row)
+
     # checks if there is a wall at a certain coordinate (in pixels)
     def has_wall_at(self, x, y):
-        if x < 0 or y < 0:
-            return True
-        grid_x = int(x // TILESIZE)
-        grid_y = int(y // TILESIZE)
-        if grid_y >= len(self.grid) or grid_x >= len(self.grid[0]):
-            return True
-        return self.grid[grid_y][grid_x] != 0  # Ensure 0 is empty, nonzero is wall
-    
-    def render(self, screen):
-        for i in range(len(self.grid)):
-            for j in range(len(self.grid[0])):
+        return self.wall_type_at(x, y) != 0
+
+    # wall type at a certain coordinate (in pixels), everything outside of the map is a wall of type 1
+    def wall_type_at(self, x, y):
+        grid_x = int(x // TILESIZE) + 1
+        grid_y = int(y // TILESIZE) + 1
+        if 0 <= grid_y < self.rows + 2 and 0 <= grid_x < self.cols + 2:
+            return self.cells[grid_y, grid_x]
+        return 1
+
+    # checks if pixel coordinates are inside the map including its border. wall_types_at can
+    # look up any point for which this is true without further bounds checks
+    def contains(self, xs, ys):
+        return (xs >= -TILESIZE) & (ys >= -TILESIZE) & (xs < self.width + TILESIZE) & (ys < self.height + TILESIZE)
+
+    # vectorized wall_type_at for arrays of pixel coordinates that are inside the map (see contains)
+    def wall_types_at(self, xs, ys):
+        grid_x = (xs // TILESIZE).astype(np.intp) + 1
+        grid_y = (ys // TILESIZE).astype(np.intp) + 1
+        return self.cells[grid_y, grid_x]
+
+    # clearance of the tiles at arrays of pixel coordinates that are inside the map (see contains)
+    def clearance_at(self, xs, ys):
+        grid_x = (xs // TILESIZE).astype(np.intp) + 1
+        grid_y = (ys // TILESIZE).astype(np.intp) + 1
+        return self.clearance[grid_y, grid_x]
+
+    # Batched ray queries for game logic (AI visibility, hearing, fog of war, ...), traced through
+    # the grid like the rays of the renderer. Every argument is one value or one per query.
+
+    # walls between arrays of origins and targets (in pixels). Returns (hit, hit_x, hit_y,
+    # distance) arrays: whether a wall blocks the line, the first point of the wall on it and
+    # the distance from the origin to that point. A query that isn't blocked sees its target,
+    # hit_x/hit_y is the target and the distance is the one to the target
+    def line_of_sight(self, origin_x, origin_y, target_x, target_y):
+        dx = np.asarray(target_x, dtype=np.float64) - origin_x
+        dy = np.asarray(target_y, dtype=np.float64) - origin_y
+        length = np.hypot(dx, dy)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dir_x = np.where(length > 0, dx / length, 0)
+            dir_y = np.where(length > 0, dy / length, 0)
+        hit, hit_x, hit_y, distance, _ = trace_rays(self, origin_x, origin_y, dir_x, dir_y, length)
+        return hit, hit_x, hit_y, distance
+
+    # the first wall along rays from arrays of origins (in pixels) at angles (in radians), up to
+    # max_distance pixels away. Returns (hit, hit_x, hit_y, distance, wall_type) arrays, see
+    # BatchCaster.trace_rays
+    def raycast(self, origin_x, origin_y, angle, max_distance=np.inf):
+        return trace_rays(self, origin_x, origin_y, np.cos(angle), np.sin(angle), max_distance)
+
+    # draws the tiles from (first_col, first_row) on that fit on the screen, with scale screen
+    # pixels per map pixel. Tile edges are rounded in map coordinates, so screens drawn from
+    # different first tiles line up when they are put next to each other
+    def render(self, screen, scale=1, first_col=0, first_row=0):
+        tile = TILESIZE * scale
+        origin_x = round(first_col * tile)
+        origin_y = round(first_row * tile)
+        rows = min(self.rows - first_row, math.ceil(screen.get_height() / tile) + 1)
+        cols = min(self.cols - first_col, math.ceil(screen.get_width() / tile) + 1)
+        tiles = self.region(first_row, first_col, rows, cols).tolist()
+        for i in range(first_row, first_row + rows):
+            for j in range(first_col, first_col + cols):
                 # pixel coordinates
-                tile_x = j * TILESIZE
-                tile_y = i * TILESIZE
+                tile_x = round(j * tile) - origin_x
+                tile_y = round(i * tile) - origin_y
+                size_x = round((j + 1) * tile) - round(j * tile) - 1
+                size_y = round((i + 1) * tile) - round(i * tile) - 1
+
+                if tiles[i - first_row][j - first_col] == 0:
+                    pygame.draw.rect(screen, (255, 255, 255), (tile_x, tile_y, size_x, size_y))
+                else:
+                    pygame.draw.rect(screen, (40, 40, 40), (tile_x, tile_y, size_x, size_y))
+
+
+# chessboard distance from every cell to the closest wall cell, capped at `limit`. Grows the
+# walls one cell in all eight directions per pass, so it takes at most `limit` passes
+def _clearance(cells, limit=SKIP_DISTANCE_LIMIT):
+    reached = cells != 0
+    clearance = np.full(cells.shape, limit, dtype=np.uint8)
+    clearance[reached] = 0
+
+    for distance in range(1, limit):
+        grown = reached.copy()
+        grown[1:] |= reached[:-1]
+        grown[:-1] |= reached[1:]
+        rows = grown.copy()
+        grown[:, 1:] |= rows[:, :-1]
+        grown[:, :-1] |= rows[:, 1:]
+
+        clearance[grown & ~reached] = distance
+        reached = grown
+        if reached.all():
+            break
 
-                if self.grid[i][j] == 0:
-                    pygame.draw.rect(screen, (255, 255, 255), (tile_x, tile_y, TILESIZE - 1, TILESIZE - 1))
-                elif self.grid[i][j] == 1:
-                    pygame.draw.rect(screen, (40, 40, 40), (tile_x, tile_y, TILESIZE - 1, TILESIZE - 1))
\ No newline at end of file
+    return clearance
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import numpy as np
+import pygame
+from settings import *
+
+BACKGROUND_COLOR = (30, 30, 30)
+FAN_COLOR = (255, 220, 120)
+
+# rays drawn in the fan
+FAN_RAYS = 60
+
+
+# The minimap. Its tile layer is drawn once, at the same scale the player is drawn with, into
+# cached chunks of MINIMAP_CHUNK x MINIMAP_CHUNK tiles, and a chunk is only drawn again when
+# a tile in it changes. Every frame just blits the chunks under the viewport and draws the ray
+# fan and the player on top. Maps bigger than the minimap scroll with the player.
+class Minimap:
+    def __init__(self, map, size=MINIMAP_SIZE, scale=MINIMAP_SCALE, chunk=MINIMAP_CHUNK, max_chunks=MINIMAP_CHUNKS):
+        self.map = map
+        self.size = size
+        self.scale = scale
+        self.chunk = chunk
+        self.max_chunks = max_chunks
+
+        # size of a tile and of the whole map on the minimap
+        self.tile = TILESIZE * scale
+        self.width = round(map.cols * self.tile)
+        self.height = round(map.rows * self.tile)
+
+        self.chunks = OrderedDict()
+        self.surface = pygame.Surface((size, size))
+
+        map.listeners.append(self.invalidate)
+
+    # a tile changed, the chunk it is in has to be drawn again
+    def invalidate(self, col, row):
+        self.chunks.pop((col // self.chunk, row // self.chunk), None)
+
+    def _chunk(self, chunk_col, chunk_row):
+        key = (chunk_col, chunk_row)
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.chunks.move_to_end(key)
+            return surface
+
+        first_col = chunk_col * self.chunk
+        first_row = chunk_row * self.chunk
+        last_col = min(first_col + self.chunk, self.map.cols)
+        last_row = min(first_row + self.chunk, self.map.rows)
+        surface = pygame.Surface((
+            round(last_col * self.tile) - round(first_col * self.tile),
+            round(last_row * self.tile) - round(first_row * self.tile),
+        ))
+        surface.fill(BACKGROUND_COLOR)
+        self.map.render(surface, self.scale, first_col, first_row)
+
+        self.chunks[key] = surface
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return surface
+
+    # top-left corner of the part of the map that is shown, in minimap pixels. It follows the
+    # player, but never scrolls past the edges of the map
+    def viewport(self, player):
+        x = int(player.x * self.scale) - self.size // 2
+        y = int(player.y * self.scale) - self.size // 2
+        x = max(0, min(x, self.width - self.size))
+        y = max(0, min(y, self.height - self.size))
+        return x, y
+
+    def render(self, screen, player, rays, position=(10, 10)):
+        view_x, view_y = self.viewport(player)
+        self.surface.fill(BACKGROUND_COLOR)
+
+        # chunks under the viewport
+        chunk_size = self.chunk * self.tile
+        last_chunk_col = (self.map.cols - 1) // self.chunk
+        last_chunk_row = (self.map.rows - 1) // self.chunk
+        for chunk_row in range(int(view_y // chunk_size), min(int((view_y + self.size) // chunk_size), last_chunk_row) + 1):
+            for chunk_col in range(int(view_x // chunk_size), min(int((view_x + self.size) // chunk_size), last_chunk_col) + 1):
+                self.surface.blit(self._chunk(chunk_col, chunk_row), (
+                    round(chunk_col * chunk_size) - view_x,
+                    round(chunk_row * chunk_size) - view_y,
+                ))
+
+        # fan from the player to where the rays hit, drawn with a subset of the rays
+        if len(rays) > 1:
+            step = max(1, len(rays) // FAN_RAYS)
+            hits = np.r_[np.arange(0, len(rays), step), len(rays) - 1]
+            xs = np.clip(rays.hit_x[hits] * self.scale - view_x, -self.size, 2 * self.size)
+            ys = np.clip(rays.hit_y[hits] * self.scale - view_y, -self.size, 2 * self.size)
+            points = [(player.x * self.scale - view_x, player.y * self.scale - view_y)]
+            points.extend(zip(xs.tolist(), ys.tolist()))
+            pygame.draw.polygon(self.surface, FAN_COLOR, points)
+
+        player.render(self.surface, self.scale, view_x, view_y)
+
+        screen.blit(self.surface, position)
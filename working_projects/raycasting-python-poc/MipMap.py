@@ -0,0 +1,41 @@
+import numpy as np
+import pygame
+
+# Mipmaps for the wall textures. A far away wall column is only a few pixels tall, drawing it
+# from the full size texture takes one of every few texture pixels (and which ones changes as
+# the player moves, so distant walls shimmer). Drawing it from a smaller copy where every
+# pixel is the average of the ones it replaces is both cheaper and smoother.
+
+
+# the texture followed by copies of half the size of the one before (2x2 pixel averages), down
+# to a copy that is 1 pixel tall
+def mip_chain(texture):
+    pixels = pygame.surfarray.array3d(texture).astype(np.float64)  # [x, y, channel]
+    chain = [texture]
+    while pixels.shape[1] > 1:
+        width, height = pixels.shape[:2]
+        if width > 1:
+            pixels = (pixels[0 : width // 2 * 2 : 2] + pixels[1 : width // 2 * 2 : 2]) / 2
+        pixels = (pixels[:, 0 : height // 2 * 2 : 2] + pixels[:, 1 : height // 2 * 2 : 2]) / 2
+
+        level = pygame.Surface(pixels.shape[:2], 0, texture)
+        pygame.surfarray.blit_array(level, pixels.round().astype(np.uint8))
+        chain.append(level)
+    return chain
+
+
+# mip level to draw columns of line_height pixels from, for a texture `texture_height` pixels
+# tall with `levels` mip levels: the smallest one that is still at least as tall as the column
+def mip_levels(line_height, texture_height, levels, out=None):
+    heights = np.maximum(line_height.astype(np.intp), 1)
+    level = np.floor(np.log2(texture_height / heights))
+    np.clip(level, 0, levels - 1, out=level)
+    if out is None:
+        return level.astype(np.intp)
+    out[:] = level
+    return out
+
+
+# x of texture column texture_x of a texture `width` pixels wide in a mip level `mip_width` wide
+def mip_x(texture_x, width, mip_width):
+    return texture_x * mip_width // width
@@ -0,0 +1,111 @@
+import multiprocessing
+import time
+import numpy as np
+from settings import *
+from Map import Map
+from ChunkedMap import ChunkedMap
+from Camera import Camera
+from RayBuffer import RayBuffer
+from BatchCaster import cast_rays
+
+# Casts the columns of a frame in worker processes. The rays are split into contiguous
+# strips, one per worker, and every worker runs the batched caster on its strip.
+# Both the map (cells and clearance) and the results live in shared memory: workers read the map the main
+# process plays on and write distances, hits and wall types straight into the RayBuffer
+# the renderer reads, only the player pose and the strip timings go through the pipes.
+# Chunked worlds are opened by every worker on its own (the file is shared by the OS).
+
+
+def _worker(connection, cells_memory, clearance_memory, cells_shape, rays_memory, capacity, world=None):
+    if world:
+        map = ChunkedMap(world)
+    else:
+        map = Map.from_cells(
+            np.frombuffer(cells_memory, dtype=np.uint8).reshape(cells_shape),
+            np.frombuffer(clearance_memory, dtype=np.uint8).reshape(cells_shape),
+        )
+    rays = RayBuffer(capacity, memoryview(rays_memory).cast("B"))
+    camera = None
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        x, y, rotation, fov, num_rays, width, start, stop = message
+
+        began = time.perf_counter()
+        if camera is None:
+            camera = Camera(fov, num_rays, width)
+        camera.configure(fov, num_rays, width)
+        dir_x, dir_y = camera.rotate(rotation)
+        passes, lookups = cast_rays(map, x, y, dir_x[start:stop], dir_y[start:stop], rays.view(start, stop))
+        connection.send((time.perf_counter() - began, passes, lookups))
+
+
+class ParallelCaster:
+    # capacity is the most rays a frame can have (one per pixel column of the window)
+    def __init__(self, map, workers=CAST_WORKERS, capacity=WINDOW_WIDTH):
+        self.workers = workers
+        self.capacity = capacity
+
+        # move the map into shared memory, the map keeps working on the shared copy so
+        # edits to it are seen by the workers too (chunked worlds stay where they are)
+        world = map.path if isinstance(map, ChunkedMap) else None
+        if world:
+            cells_memory = clearance_memory = cells_shape = None
+        else:
+            cells_memory = multiprocessing.RawArray("B", map.cells.nbytes)
+            cells = np.frombuffer(cells_memory, dtype=np.uint8).reshape(map.cells.shape)
+            cells[:] = map.cells
+            clearance_memory = multiprocessing.RawArray("B", map.clearance.nbytes)
+            clearance = np.frombuffer(clearance_memory, dtype=np.uint8).reshape(map.clearance.shape)
+            clearance[:] = map.clearance
+            map.use_cells(cells, clearance)
+            cells_shape = cells.shape
+
+        rays_memory = multiprocessing.RawArray("B", RayBuffer.nbytes(capacity))
+        self.buffer = RayBuffer(capacity, memoryview(rays_memory).cast("B"))
+        self.rays = self.buffer.view(0, 0)
+
+        self.connections = []
+        self.processes = []
+        for _ in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(worker_connection, cells_memory, clearance_memory, cells_shape, rays_memory, capacity, world),
+                daemon=True,
+            )
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+        # seconds every worker spent on its strip in the last frame, and how many frames were cast
+        self.strip_times = [0.0] * workers
+        self.casts = 0
+        # lock-step passes (of the slowest strip) and grid lookups of the last frame
+        self.stats = [0, 0]
+
+    # casts all the columns of the camera from (x, y) and returns the RayBuffer holding the results
+    def cast(self, x, y, rotation, camera):
+        num_rays = camera.num_rays
+        if num_rays > self.capacity:
+            raise ValueError(f"{num_rays} rays don't fit in a buffer for {self.capacity}")
+        if num_rays != self.rays.size:
+            self.rays = self.buffer.view(0, num_rays)
+
+        bounds = np.linspace(0, num_rays, self.workers + 1).astype(int)
+        for connection, start, stop in zip(self.connections, bounds[:-1], bounds[1:]):
+            connection.send((x, y, rotation, camera.fov, num_rays, camera.width, start, stop))
+        results = [connection.recv() for connection in self.connections]
+        self.strip_times = [seconds for seconds, _, _ in results]
+        self.casts += 1
+        self.stats = [max(passes for _, passes, _ in results), sum(lookups for _, _, lookups in results)]
+
+        return self.rays
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+        for process in self.processes:
+            process.join()
@@ -3,31 +3,47 @@ from settings import *
 import math
 
 class Player:
-    def __init__(self):
-        self.x = WINDOW_WIDTH / 2
-        self.y = WINDOW_HEIGHT / 2
+    def __init__(self, x=WINDOW_WIDTH / 2, y=WINDOW_HEIGHT / 2):
+        self.x = x
+        self.y = y
         self.radius = 3
         self.turnDirection = 0
         self.walkDirection = 0
         self.rotationAngle = 0
+        # per update, the game logic runs TICK_RATE updates per second (see FixedTimestep)
         self.moveSpeed = 2.5
         self.rotationSpeed = 2 * (math.pi / 180)
-    
-    def update(self):
 
+        # (x, y, rotationAngle) before the last update, see interpolate
+        self.previous = (x, y, 0)
+    
+    # reads the arrow keys as (turnDirection, moveDirection)
+    def read_controls(self):
         keys = pygame.key.get_pressed()
 
-        self.turnDirection = 0
-        self.moveDirection = 0
+        turnDirection = 0
+        moveDirection = 0
 
         if keys[pygame.K_RIGHT]:
-            self.turnDirection = 1
+            turnDirection = 1
         if keys[pygame.K_LEFT]:
-            self.turnDirection = -1
+            turnDirection = -1
         if keys[pygame.K_UP]:
-            self.moveDirection = 1
+            moveDirection = 1
         if keys[pygame.K_DOWN]:
-            self.moveDirection = -1
+            moveDirection = -1
+
+        return turnDirection, moveDirection
+
+    # controls is a (turnDirection, moveDirection) pair, by default it's read from the keyboard
+    def update(self, controls=None):
+
+        if controls is None:
+            controls = self.read_controls()
+
+        self.turnDirection, self.moveDirection = controls
+
+        self.previous = (self.x, self.y, self.rotationAngle)
 
         self.rotationAngle += self.turnDirection * self.rotationSpeed
 
@@ -40,17 +56,29 @@ class Player:
         if self.rotationAngle > 2 * math.pi:
             self.rotationAngle -= 2 * math.pi
     
-    def render(self, screen):
-        pygame.draw.circle(screen, (255, 0, 0), (self.x, self.y), self.radius)
+    # puts the pose `alpha` (0 to 1) of the way from the one before the last update to the
+    # current one into `out` (x, y and rotationAngle), for drawing in between two updates
+    def interpolate(self, alpha, out):
+        x, y, rotation = self.previous
+        out.x = x + (self.x - x) * alpha
+        out.y = y + (self.y - y) * alpha
+
+        # the short way around, the angle may have wrapped between 0 and 2 pi
+        turned = (self.rotationAngle - rotation + math.pi) % (2 * math.pi) - math.pi
+        out.rotationAngle = (rotation + turned * alpha) % (2 * math.pi)
+        return out
+
+    # draws the player on the minimap, which shows the map at `scale` with (offset_x, offset_y)
+    # (in minimap pixels) in its top-left corner
+    def render(self, screen, scale=MINIMAP_SCALE, offset_x=0, offset_y=0):
+        px = int(self.x * scale - offset_x)
+        py = int(self.y * scale - offset_y)
 
-        pygame.draw.line(screen, (255, 0, 0), (self.x, self.y), (self.x + math.cos(self.rotationAngle) * 50, self.y + math.sin(self.rotationAngle) * 50))
+        pygame.draw.circle(screen, (255, 0, 0), (px, py), self.radius)
 
         # Draw direction arrow
-        minimap_scale = 0.2  # Adjust if needed
-        px = int(self.x * minimap_scale)
-        py = int(self.y * minimap_scale)
         length = 20  # Arrow length
         dx = int(math.cos(self.rotationAngle) * length)
         dy = int(math.sin(self.rotationAngle) * length)
         arrow_end = (px + dx, py + dy)
-        pygame.draw.line(screen, (255, 0, 0), (px, py), arrow_end, 3)
\ No newline at end of file
+        pygame.draw.line(screen, (255, 0, 0), (px, py), arrow_end, 3)
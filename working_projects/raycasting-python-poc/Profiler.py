@@ -0,0 +1,159 @@
+import bisect
+import json
+import time
+import numpy as np
+import pygame
+from settings import *
+
+# upper bucket edges of the per stage histograms, in milliseconds
+HISTOGRAM_EDGES_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 33, 66)
+HISTOGRAM_LABELS = tuple(f"<={edge}" for edge in HISTOGRAM_EDGES_MS) + (f">{HISTOGRAM_EDGES_MS[-1]}",)
+
+STAGE_COLORS = (
+    (230, 80, 80),
+    (80, 200, 80),
+    (80, 140, 240),
+    (230, 200, 60),
+    (200, 90, 220),
+    (90, 220, 220),
+    (240, 150, 60),
+)
+
+
+# Times the stages of every frame. Call begin_frame() when a frame starts, mark(stage) when a
+# stage is done (it is timed from the previous mark) and end_frame() at the end. The last
+# `history` frames are kept in a ring buffer with a rolling histogram per stage, they can be
+# drawn as a graph over the game and every frame can be traced to a JSON lines file.
+# While the profiler is disabled every call returns right away.
+class Profiler:
+    def __init__(self, stages, history=PROFILER_HISTORY, enabled=False):
+        self.stages = tuple(stages)
+        self.index = {stage: i for i, stage in enumerate(self.stages)}
+        self.history = history
+
+        self.overlay = enabled
+        self.trace = None
+        self.enabled = enabled
+
+        self.reset()
+
+    def reset(self):
+        # milliseconds per frame and stage, the row of frame n is n % history
+        self.samples = np.zeros((self.history, len(self.stages)))
+        self.histograms = np.zeros((len(self.stages), len(HISTOGRAM_EDGES_MS) + 1), dtype=np.int64)
+        self.frames = 0
+        self.current = [0.0] * len(self.stages)
+        self.last = 0.0
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self._update_enabled()
+
+    # starts writing every frame to `path`, or stops if a trace is already being written
+    def toggle_trace(self, path):
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+        else:
+            self.trace = open(path, "w")
+        self._update_enabled()
+
+    def _update_enabled(self):
+        self.enabled = self.overlay or self.trace is not None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[self.index[stage]] += (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        row = self.frames % self.history
+
+        # the frame that drops out of the window leaves the histograms
+        if self.frames >= self.history:
+            for stage, ms in enumerate(self.samples[row]):
+                self.histograms[stage, bisect.bisect_left(HISTOGRAM_EDGES_MS, ms)] -= 1
+
+        self.samples[row] = self.current
+        for stage, ms in enumerate(self.current):
+            self.histograms[stage, bisect.bisect_left(HISTOGRAM_EDGES_MS, ms)] += 1
+
+        if self.trace:
+            self.trace.write(json.dumps({
+                "frame": self.frames,
+                "time": time.perf_counter(),
+                "ms": dict(zip(self.stages, self.current)),
+            }) + "\n")
+
+        self.frames += 1
+        self.current = [0.0] * len(self.stages)
+
+    # the frames in the window, oldest first
+    def window(self):
+        if self.frames < self.history:
+            return self.samples[: self.frames]
+        return np.roll(self.samples, -(self.frames % self.history), axis=0)
+
+    # mean and p50/p95/p99 in milliseconds of every stage and of the whole frame, and the
+    # histogram of every stage (frames per bucket of HISTOGRAM_LABELS)
+    def summary(self):
+        samples = self.window()
+        columns = {stage: samples[:, i] for i, stage in enumerate(self.stages)}
+        columns["frame"] = samples.sum(axis=1)
+        summary = {}
+        for name, ms in columns.items():
+            if len(ms) == 0:
+                ms = np.zeros(1)
+            summary[name] = {
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+            }
+        for i, stage in enumerate(self.stages):
+            summary[stage]["histogram"] = dict(zip(HISTOGRAM_LABELS, self.histograms[i].tolist()))
+        return summary
+
+    # stacked bar graph of the frames in the window (one pixel column per frame) and the
+    # histogram and p50/p95 of every stage next to it
+    def draw(self, screen, font, x, y, height=100, budget_ms=1000 / 60):
+        samples = self.window()
+        width = self.history
+
+        # top of every stage in every bar, in pixels from the bottom of the graph
+        tops = np.cumsum(samples, axis=1) * (height / (2 * budget_ms))
+        rows = np.arange(height)[::-1]  # pixel row 0 is the top of the graph
+
+        # stage every pixel of the graph belongs to (len(stages) where there is no bar)
+        stage = (rows[None, :, None] >= tops[:, None, :]).sum(axis=2)
+
+        palette = np.array(STAGE_COLORS[: len(self.stages)] + ((20, 20, 20),), dtype=np.uint8)
+        pixels = np.zeros((width, height, 3), dtype=np.uint8)
+        pixels[width - len(samples):] = palette[stage]
+
+        # line at the frame budget
+        pixels[:, height - height // 2] = (255, 255, 255)
+
+        screen.blit(pygame.surfarray.make_surface(pixels), (x, y))
+
+        summary = self.summary()
+        left = x + width + 10
+        for i, name in enumerate(self.stages):
+            # one bar per bucket, as tall as its share of the frames in the window
+            counts = self.histograms[i]
+            bar_height = counts * 14 // max(counts.max(), 1)
+            for bucket, bar in enumerate(bar_height.tolist()):
+                if bar:
+                    pygame.draw.rect(screen, STAGE_COLORS[i], (left + bucket * 4, y + i * 18 + 15 - bar, 3, bar))
+
+            text = f"{name}: {summary[name]['p50_ms']:.2f} / {summary[name]['p95_ms']:.2f} ms"
+            screen.blit(font.render(text, True, STAGE_COLORS[i]), (left + len(counts) * 4 + 6, y + i * 18))
@@ -83,28 +83,11 @@ class Ray:
             add xa and ya to the current position
         """
 
-        # while it is inside the window
-        while (nextHorizontalX <= WINDOW_WIDTH and nextHorizontalX >= 0 and nextHorizontalY <= WINDOW_HEIGHT and nextHorizontalY >= 0):
-            grid_x = int(nextHorizontalX // TILESIZE)
-            grid_y = int(nextHorizontalY // TILESIZE)
-            if (
-                0 <= grid_y < len(self.map.grid)
-                and 0 <= grid_x < len(self.map.grid[0])
-            ):
-                self.wall_type = self.map.grid[grid_y][grid_x]
-            else:
-                self.wall_type = 1  # Default wall type if out of bounds
-
-            if self.map.has_wall_at(nextHorizontalX, nextHorizontalY):
-                grid_x = int(nextHorizontalX // TILESIZE)
-                grid_y = int(nextHorizontalY // TILESIZE)
-                if (
-                    0 <= grid_y < len(self.map.grid)
-                    and 0 <= grid_x < len(self.map.grid[0])
-                ):
-                    self.wall_type = self.map.grid[grid_y][grid_x]
-                else:
-                    self.wall_type = 1  # Default wall type if out of bounds
+        # while it is inside the map
+        while (nextHorizontalX < self.map.width + TILESIZE and nextHorizontalX >= -TILESIZE and nextHorizontalY < self.map.height + TILESIZE and nextHorizontalY >= -TILESIZE):
+            self.wall_type = self.map.wall_type_at(nextHorizontalX, nextHorizontalY)
+
+            if self.wall_type != 0:
                 found_horizontal_wall = True
                 horizontal_hit_x = nextHorizontalX
                 horizontal_hit_y = nextHorizontalY
@@ -140,8 +123,8 @@ class Ray:
         
         ya = xa * math.tan(self.rayAngle)
 
-        # while it is inside the window
-        while (nextVerticalX <= WINDOW_WIDTH and nextVerticalX >= 0 and nextVerticalY <= WINDOW_HEIGHT and nextVerticalY >= 0):
+        # while it is inside the map
+        while (nextVerticalX < self.map.width + TILESIZE and nextVerticalX >= -TILESIZE and nextVerticalY < self.map.height + TILESIZE and nextVerticalY >= -TILESIZE):
             if self.map.has_wall_at(nextVerticalX, nextVerticalY):
                 found_vertical_wall = True
                 vertical_hit_x = nextVerticalX
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Struct-of-arrays storage for the result of a cast: one typed array per ray attribute
+# instead of one Ray object per column. The arrays are allocated once and filled in place
+# every frame, they are only reallocated when the number of rays changes.
+#
+# The arrays can also be laid out in a block of memory owned by someone else (e.g. shared
+# memory that worker processes write into), see nbytes() and the memory argument.
+class RayBuffer:
+    FIELDS = (
+        ("angle", np.float64),
+        ("distance", np.float64),  # fisheye corrected
+        ("length", np.float64),  # distance along the ray
+        ("hit_x", np.float64),
+        ("hit_y", np.float64),
+        ("hit_vertical", np.bool_),
+        ("wall_type", np.uint8),
+        ("shade", np.uint8),
+        ("shade_level", np.uint8),
+        ("texture_x", np.intp),
+        ("mip", np.uint8),
+        ("line_height", np.float64),
+    )
+
+    def __init__(self, size=0, memory=None):
+        self.size = -1
+        self.memory = memory
+        self.resize(size)
+
+    # bytes of memory a buffer of `size` rays needs, every array starts 8 byte aligned
+    @classmethod
+    def nbytes(cls, size):
+        return sum(_aligned(np.dtype(dtype).itemsize * size) for _, dtype in cls.FIELDS)
+
+    def resize(self, size):
+        if size == self.size:
+            return
+        if self.memory is not None and self.size != -1:
+            raise ValueError("a RayBuffer on external memory can't be resized, use view() instead")
+        self.size = size
+
+        offset = 0
+        for name, dtype in self.FIELDS:
+            if self.memory is None:
+                array = np.zeros(size, dtype=dtype)
+            else:
+                array = np.ndarray(size, dtype=dtype, buffer=self.memory, offset=offset)
+                offset += _aligned(array.nbytes)
+            setattr(self, name, array)
+
+    # buffer for the rays start to stop, sharing the arrays (and so the memory) of this one
+    def view(self, start, stop):
+        view = RayBuffer.__new__(RayBuffer)
+        view.size = stop - start
+        view.memory = None
+        for name, _ in self.FIELDS:
+            setattr(view, name, getattr(self, name)[start:stop])
+        return view
+
+    # makes this buffer a copy of `other`
+    def assign(self, other):
+        self.resize(other.size)
+        for name, _ in self.FIELDS:
+            np.copyto(getattr(self, name), getattr(other, name))
+
+    def __len__(self):
+        return self.size
+
+
+def _aligned(nbytes):
+    return (nbytes + 7) // 8 * 8
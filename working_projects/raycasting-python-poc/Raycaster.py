@@ -1,6 +1,15 @@
-import pygame
+import math
+import numpy as np
 from settings import *
 from Ray import *
+from BatchCaster import cast_rays
+from RayBuffer import RayBuffer
+from Camera import Camera
+from TextureCache import TextureColumnCache
+from ParallelCaster import ParallelCaster
+from ShadeTable import shade_levels
+from MipMap import mip_levels
+from TextureAtlas import TextureAtlas
 
 # Example color mapping for wall types
 WALL_COLORS = {
@@ -12,58 +21,166 @@ WALL_COLORS = {
 }
 
 class Raycaster:
-    def __init__(self, player, map):
-        self.rays = []
+    def __init__(self, player, map, workers=CAST_WORKERS, atlas=None, columns=None):
+        self.res = RES
+        self.num_rays = NUM_RAYS
+        self.rays = RayBuffer(self.num_rays)
+        self.camera = Camera(FOV, self.num_rays, WINDOW_WIDTH)
         self.player = player
         self.map = map
 
-        # Load wall textures after display is initialized
-        # Only load textures that exist
-        self.WALL_TEXTURES = {
-            1: pygame.image.load("wall1.png").convert(),
-            # 2: pygame.image.load("wall2.png").convert(),  # Remove or comment out if wall2.png does not exist
-        }
+        # cast in worker processes if there are any configured
+        self.parallel = ParallelCaster(map, workers) if workers else None
 
+        # draw every column as wide as it is instead of as a 1 pixel strip, so the picture keeps
+        # its size when the resolution changes
+        self.stretch = DYNAMIC_RESOLUTION
+
+        # lock-step passes and grid lookups the last cast took
+        self.cast_stats = [0, 0]
+
+        # (x, y, rotation, num_rays) the rays in self.rays were cast for, None if they can't be
+        # reused, and how many columns the last cast took over from the frame before
+        self.pose = None
+        self.reused = 0
+        map.listeners.append(self.invalidate)
+
+        # Load wall textures after display is initialized: every wall type of WALL_COLORS has a
+        # generated one, the atlas of them is loaded from its cache after the first start. A
+        # raycaster that only casts for another one (see CastPipeline) shares its atlas and
+        # column cache
+        self.atlas = atlas or TextureAtlas(WALL_COLORS)
+        self.WALL_TEXTURES = self.atlas.textures()
+        self.columns = columns or TextureColumnCache(self.WALL_TEXTURES)
+
+        # texture used for every wall type (wall types without a texture of their own use texture 1)
+        self.texture_ids = np.array([t if t in self.WALL_TEXTURES else 1 for t in range(256)], dtype=np.uint8)
+        self.texture_widths = np.array([self.WALL_TEXTURES[t].get_width() for t in self.texture_ids], dtype=np.intp)
+        self.texture_heights = np.array([self.WALL_TEXTURES[t].get_height() for t in self.texture_ids], dtype=np.intp)
+        self.mip_counts = np.array([int(height).bit_length() for height in self.texture_heights], dtype=np.intp)
+
+
+    # changes the column width in pixels, the rays are cast at the new resolution from the next frame on
+    def set_resolution(self, res):
+        self.res = res
+        self.num_rays = WINDOW_WIDTH // res
+
+    # the map changed, the rays of the last frame can't be reused
+    def invalidate(self, col=None, row=None):
+        self.pose = None
+
+    # how many columns the view turned since the last cast, if it is a whole number of them
+    # (with SNAP_ROTATION the nearest whole number). The rotation of the cached rays is tracked
+    # as the exact multiple of the column step it should be, so small errors in the player's
+    # rotation don't add up over many frames
+    def _column_shift(self, x, y, rotation):
+        last_x, last_y, last_rotation, num_rays = self.pose
+        if (x, y, num_rays) != (last_x, last_y, self.num_rays):
+            return None
+        step = self.camera.fov / num_rays
+        turned = (rotation - last_rotation + math.pi) % (2 * math.pi) - math.pi
+        columns = round(turned / step)
+        tolerance = step / 2 if SNAP_ROTATION else REUSE_TOLERANCE
+        if abs(turned - columns * step) > tolerance or abs(columns) >= num_rays:
+            return None
+        return columns, last_rotation + columns * step
 
     def castAllRays(self):
-        self.rays = []
-        rayAngle = (self.player.rotationAngle - FOV/2)
-        for i in range(NUM_RAYS):
-            ray = Ray(rayAngle, self.player, self.map)
-            ray.cast()
-            self.rays.append(ray)
-
-            rayAngle += FOV / NUM_RAYS
+        camera = self.camera
+        camera.configure(FOV, self.num_rays, WINDOW_WIDTH)
+        x, y, rotation = self.player.x, self.player.y, self.player.rotationAngle
+
+        shift = self._column_shift(x, y, rotation) if TEMPORAL_REUSE and self.pose else None
+        if shift is not None and SNAP_ROTATION:
+            # the view is drawn at the rotation the reused rays stand for, so the floor and the
+            # sprites line up with the walls
+            rotation = self.player.rotationAngle = shift[1] % (2 * math.pi)
+        if shift is not None and shift[0] == 0:
+            # standing still, last frame's rays are still right
+            self.cast_stats = [0, 0]
+            self.reused = self.num_rays
+            return
+
+        rays = self.rays
+        if shift is not None:
+            # turned by a whole number of columns: column i now looks where column i + columns
+            # looked, so the rays move over and only the columns that came into view are cast
+            columns, cast_rotation = shift
+            n = self.num_rays
+            kept = slice(0, n - columns) if columns > 0 else slice(-columns, n)
+            moved = slice(columns, n) if columns > 0 else slice(0, n + columns)
+            new = (n - columns, n) if columns > 0 else (0, -columns)
+            for name in ("length", "hit_x", "hit_y", "hit_vertical", "wall_type"):
+                array = getattr(rays, name)
+                array[kept] = array[moved]
+            # (at the rotation the kept rays stand for, so all the columns fit together)
+            dir_x, dir_y = camera.rotate(cast_rotation)
+            start, stop = new
+            self.cast_stats = cast_rays(self.map, x, y, dir_x[start:stop], dir_y[start:stop], rays.view(start, stop))
+            self.reused = n - abs(columns)
+        elif self.parallel:
+            # every worker casts a strip of the columns straight into the shared buffer
+            rays = self.rays = self.parallel.cast(x, y, rotation, camera)
+            self.cast_stats = self.parallel.stats
+            cast_rotation = rotation
+            self.reused = 0
+        else:
+            # all the columns are cast at once by the batched caster, one array element per ray
+            rays.resize(self.num_rays)
+            dir_x, dir_y = camera.rotate(rotation)
+            self.cast_stats = cast_rays(self.map, x, y, dir_x, dir_y, rays)
+            cast_rotation = rotation
+            self.reused = 0
+        self.pose = (x, y, cast_rotation, self.num_rays)
+
+        camera.angles(rotation, rays.angle)
+
+        # fisheye correction
+        np.multiply(rays.length, camera.fisheye, out=rays.distance)
+
+        # same depth shading Ray.cast computes in self.color
+        shade = np.where(rays.hit_vertical, 255.0, 160.0) * (60 / rays.distance)
+        np.clip(shade, 0, 255, out=shade)
+        rays.shade[:] = shade
+
+        # darkened copy of the texture the column is drawn from
+        shade_levels(rays.shade, out=rays.shade_level)
+
+        # height of the wall on screen
+        np.divide(32, rays.distance, out=rays.line_height)
+        rays.line_height *= 415
+
+        # the x coordinate on the texture to sample
+        hit = np.where(rays.hit_vertical, rays.hit_y, rays.hit_x).astype(np.intp)
+        np.mod(hit, self.texture_widths[rays.wall_type], out=rays.texture_x)
+
+        # the mip level of the texture the column is drawn from
+        mip_levels(rays.line_height, self.texture_heights[rays.wall_type], self.mip_counts[rays.wall_type], out=rays.mip)
     
     def render(self, screen):
 
-        i = 0
-        # rendering 2d rays from 2d view
-        for ray in self.rays:
-            # ray.render(screen)
-            # rendering 3d walls over the 2d view
-
-            line_height = (32 / ray.distance) * 415
+        rays = zip(
+            self.rays.line_height.tolist(), self.rays.texture_x.tolist(),
+            self.texture_ids[self.rays.wall_type].tolist(), self.rays.shade_level.tolist(),
+            self.rays.mip.tolist()
+        )
 
-            draw_begin = (WINDOW_HEIGHT / 2) - (line_height / 2)
-            draw_end = line_height
+        column_x = self.camera.column_x
+        widths = self.camera.column_widths.tolist() if self.stretch else [1] * len(self.rays)
 
-            # Determine wall type at hit location
-            wall_type = getattr(ray, "wall_type", 1)  # Default to 1 if not set
-            texture = self.WALL_TEXTURES.get(wall_type, self.WALL_TEXTURES[1])
+        # rendering 3d walls
+        for i, (line_height, texture_x, texture_id, level, mip) in enumerate(rays):
 
-            # Calculate texture_x: the x coordinate on the texture to sample
-            # Assume ray.hit_x and ray.hit_y are the exact hit coordinates
-            if ray.hit_vertical:
-                texture_x = int(ray.hit_y) % texture.get_width()
-            else:
-                texture_x = int(ray.hit_x) % texture.get_width()
+            # columns taller than the screen only have the rows that are on it and start at the top
+            draw_begin = max((WINDOW_HEIGHT / 2) - (line_height / 2), 0)
 
-            # Sample the texture column and scale it to wall_height
-            texture_column = texture.subsurface(texture_x, 0, 1, texture.get_height())
-            texture_column = pygame.transform.scale(texture_column, (1, int(line_height)))
+            # The texture column scaled to wall_height, straight from the cache if it was drawn before
+            texture_column = self.columns.get(texture_id, texture_x, line_height, widths[i], level, mip)
 
             # Draw the texture column at the correct position
-            screen.blit(texture_column, (i*RES, draw_begin))
+            screen.blit(texture_column, (column_x[i], draw_begin))
 
-            i += 1
+    # stops the casting workers, if there are any
+    def close(self):
+        if self.parallel:
+            self.parallel.close()
@@ -0,0 +1,42 @@
+from collections import deque
+import numpy as np
+from settings import *
+
+# how far under the budget the frames must be predicted to stay before the columns get
+# narrower again, so the resolution doesn't flip back and forth at the edge of the budget
+HEADROOM = 0.8
+
+
+# Dynamic resolution. Gets the milliseconds casting and rendering took every frame and picks
+# the column width (RES) for the next one: when the median of the last `window` frames is
+# over the budget the columns get one pixel wider, and when it would still be within the
+# budget with columns one pixel narrower (the cost grows with the number of rays, so
+# res / (res - 1) times what it is now) they get narrower. After every change it waits for a
+# full window of frames at the new width before deciding again.
+class ResolutionController:
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, min_res=RES_MIN, max_res=RES_MAX, res=RES, window=RESOLUTION_WINDOW):
+        self.budget_ms = budget_ms
+        self.min_res = min_res
+        self.max_res = max_res
+        self.res = max(min_res, min(res, max_res))
+        self.samples = deque(maxlen=window)
+        self.changes = 0
+
+    # returns the column width to use from now on
+    def update(self, ms):
+        self.samples.append(ms)
+        if len(self.samples) < self.samples.maxlen:
+            return self.res
+
+        typical = float(np.median(self.samples))
+        res = self.res
+        if typical > self.budget_ms and res < self.max_res:
+            res += 1
+        elif res > self.min_res and typical * res / (res - 1) < self.budget_ms * HEADROOM:
+            res -= 1
+
+        if res != self.res:
+            self.res = res
+            self.samples.clear()
+            self.changes += 1
+        return self.res
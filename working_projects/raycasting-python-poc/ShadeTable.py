@@ -0,0 +1,25 @@
+import numpy as np
+import pygame
+from settings import *
+
+# Depth shading without any color math while drawing. Every wall texture is darkened to
+# SHADE_LEVELS brightness levels once, when it is loaded, and a column is drawn from the copy
+# for its shade level. The shade the Raycaster computes for every ray (Ray.cast's color:
+# distance fog, with horizontal walls darker than vertical ones) picks the level, so depth
+# fog and side shading both come with the lookup.
+
+
+# shade level (0 is the darkest, levels - 1 the texture as it is) of shade values 0 to 255
+def shade_levels(shade, levels=SHADE_LEVELS, out=None):
+    return np.floor_divide(shade.astype(np.intp) * levels, 256, out=out, casting="unsafe")
+
+
+# copies of `texture` darkened to every shade level, the last one has the texture's own colors
+def shaded_copies(texture, levels=SHADE_LEVELS):
+    pixels = pygame.surfarray.array3d(texture)
+    copies = []
+    for level in range(levels):
+        copy = texture.copy()
+        pygame.surfarray.blit_array(copy, (pixels * ((level + 1) / levels)).astype(np.uint8))
+        copies.append(copy)
+    return copies
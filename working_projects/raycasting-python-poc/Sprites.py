@@ -0,0 +1,182 @@
+from collections import OrderedDict
+import math
+import numpy as np
+import pygame
+from settings import *
+
+# size of the generated sprite images in pixels
+SPRITE_IMAGE_SIZE = 64
+
+# height of every kind of sprite, as a fraction of a wall
+SPRITE_SCALES = {0: 0.35, 1: 0.8}
+
+# sprites closer than this (in pixels) are not drawn, they would be scaled to many times the window
+SPRITE_NEAR = 8
+
+
+# images of the kinds of sprites: 0 is a pickup, 1 a figure standing in the way
+def sprite_images():
+    size = SPRITE_IMAGE_SIZE
+    pickup = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.draw.circle(pickup, (230, 190, 40), (size // 2, size // 2), size // 2 - 2)
+    pygame.draw.circle(pickup, (255, 240, 150), (size // 2 - 8, size // 2 - 8), size // 8)
+
+    figure = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.draw.ellipse(figure, (60, 120, 220), (size // 4, size // 4, size // 2, size * 3 // 4))
+    pygame.draw.circle(figure, (230, 200, 170), (size // 2, size // 5), size // 7)
+
+    return {0: pickup, 1: figure}
+
+
+# Billboard sprites (pickups, NPCs, ...) drawn over the walls. The sprites are kept as arrays
+# (one element per sprite, like the RayBuffer) and every frame all of them are projected and
+# culled at once: sprites behind the player, outside the field of view or completely behind
+# the walls are dropped. The distances the Raycaster cast for every column are the z-buffer: a
+# sprite is only drawn over the runs of columns where it is closer than the wall, one blit per
+# run, farthest sprite first.
+class Sprites:
+    def __init__(self, xs=(), ys=(), kinds=(), images=None, max_images=SPRITE_CACHE_ENTRIES, max_bytes=SPRITE_CACHE_BYTES):
+        self.x = np.array(xs, dtype=np.float64)
+        self.y = np.array(ys, dtype=np.float64)
+        self.kind = np.array(kinds, dtype=np.intp)
+
+        self.images = images or sprite_images()
+        self.scales = np.zeros(max(self.images) + 1)
+        for kind in self.images:
+            self.scales[kind] = SPRITE_SCALES.get(kind, 1)
+
+        # scaled sprite images, keyed by (kind, height), bounded by their number and their memory
+        self.scaled = OrderedDict()
+        self.max_images = max_images
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+        # the column distances with one more element after them, see visible()
+        self.zbuffer = np.zeros(1)
+
+        # sprites drawn in the last frame
+        self.drawn = 0
+
+    # `count` sprites of random kinds in the middle of random empty tiles of the map
+    @classmethod
+    def scatter(cls, map, count, seed=0):
+        rng = np.random.default_rng(seed)
+        empty = map.empty_tiles()
+        if len(empty) == 0:
+            return cls()
+        tiles = empty[rng.integers(len(empty), size=count)]
+        images = sprite_images()
+        kinds = rng.choice(sorted(images), size=count)
+        return cls((tiles[:, 1] + 0.5) * TILESIZE, (tiles[:, 0] + 0.5) * TILESIZE, kinds, images)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y, kind):
+        self.x = np.append(self.x, x)
+        self.y = np.append(self.y, y)
+        self.kind = np.append(self.kind, kind)
+
+    # projects all the sprites for the player and camera of the raycaster and returns the
+    # visible ones, farthest first, as (indices, depth, left, top, width, height, first column,
+    # last column + 1) arrays. left/top/width/height are in screen pixels
+    def visible(self, raycaster):
+        player = raycaster.player
+        camera = raycaster.camera
+        num_rays = camera.num_rays
+
+        # angle of every sprite from the view direction and its distance along it (the same
+        # fisheye corrected distance the walls have)
+        dx = self.x - player.x
+        dy = self.y - player.y
+        angle = (np.arctan2(dy, dx) - player.rotationAngle + math.pi) % (2 * math.pi) - math.pi
+        depth = np.hypot(dx, dy) * np.cos(angle)
+
+        # columns are spread evenly over the field of view, so is the screen x of the sprites.
+        # (sprites right next to or behind the player get infinite or negative sizes here,
+        # they are culled by their depth)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            wall_height = (32 / depth) * 415
+            height = wall_height * self.scales[self.kind]
+            width = height  # the images are square
+            center = (angle + camera.fov / 2) / camera.fov * camera.width
+            left = center - width / 2
+
+            first = np.floor(left / camera.column_width)
+            last = np.ceil((left + width) / camera.column_width)
+            in_view = (depth > SPRITE_NEAR) & (height < 2 * WINDOW_HEIGHT) & (last > 0) & (first < num_rays)
+            first = np.clip(np.nan_to_num(first), 0, num_rays).astype(np.intp)
+            last = np.clip(np.nan_to_num(last), 0, num_rays).astype(np.intp)
+        in_view &= last > first
+
+        # occlusion: the farthest wall over the columns of a sprite has to be behind it. The
+        # max over every [first, last) range comes from one reduceat over alternating starts
+        # and ends (with an extra element so the ends can be num_rays)
+        if self.zbuffer.size != num_rays + 1:
+            self.zbuffer = np.zeros(num_rays + 1)
+        self.zbuffer[:num_rays] = raycaster.rays.distance
+        index = np.flatnonzero(in_view)
+        if index.size:
+            bounds = np.empty(2 * index.size, dtype=np.intp)
+            bounds[0::2] = first[index]
+            bounds[1::2] = last[index]
+            farthest = np.maximum.reduceat(self.zbuffer, bounds)[0::2]
+            index = index[depth[index] < farthest]
+
+        # back to front
+        index = index[np.argsort(-depth[index], kind="stable")]
+
+        top = WINDOW_HEIGHT / 2 + wall_height[index] / 2 - height[index]  # standing on the floor
+        return index, depth[index], left[index], top, width[index], height[index], first[index], last[index]
+
+    # image of a kind of sprite scaled to height x height pixels
+    def image(self, kind, height):
+        key = (kind, height)
+        image = self.scaled.get(key)
+        if image is not None:
+            self.scaled.move_to_end(key)
+            return image
+        image = pygame.transform.scale(self.images[kind], (height, height))
+        self.scaled[key] = image
+        self.bytes += self._size(image)
+
+        # evict the least recently used images until we are under the budget again
+        while (self.bytes > self.max_bytes or len(self.scaled) > self.max_images) and len(self.scaled) > 1:
+            _, evicted = self.scaled.popitem(last=False)
+            self.bytes -= self._size(evicted)
+        return image
+
+    def _size(self, surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def render(self, screen, raycaster):
+        index, depth, left, top, width, height, first, last = self.visible(raycaster)
+        self.drawn = len(index)
+        if not self.drawn:
+            return
+
+        # screen x where every column starts, and where the screen ends
+        camera = raycaster.camera
+        column_x = np.append(camera.column_x, camera.width)
+        zbuffer = self.zbuffer
+
+        sizes = height.astype(np.intp)
+        lefts = np.floor(left).astype(np.intp)
+        for i, kind in enumerate(self.kind[index].tolist()):
+            size = int(sizes[i])
+            if size < 1:
+                continue
+
+            # runs of columns where the sprite is in front of the wall
+            start = first[i]
+            front = zbuffer[start : last[i]] > depth[i]
+            edges = np.flatnonzero(np.diff(front, prepend=False, append=False))
+
+            image = self.image(kind, size)
+            sprite_left = int(lefts[i])
+            y = int(top[i])
+            for run_start, run_stop in zip(edges[0::2].tolist(), edges[1::2].tolist()):
+                x0 = max(int(column_x[start + run_start]), sprite_left)
+                x1 = min(int(column_x[start + run_stop]), sprite_left + size)
+                if x1 > x0:
+                    screen.blit(image, (x0, y), (x0 - sprite_left, 0, x1 - x0, size))
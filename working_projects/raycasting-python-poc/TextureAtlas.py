@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pygame
+from settings import *
+
+# Procedural wall textures. Every family is a NumPy function of the texture size, a base color
+# and a random generator that returns the pixels of one texture as a (size, size, 3) array,
+# all the pixels computed at once (no drawing calls). The textures of all the wall types are
+# packed side by side into one atlas image.
+#
+# Generating takes a while, so the atlas is cached on disk in TEXTURE_CACHE_DIR under a hash of
+# everything it is generated from: the next start only loads one PNG. Bump TEXTURE_VERSION
+# when a generator changes so the old atlases aren't used any more.
+TEXTURE_VERSION = 1
+
+
+# brick rows of `columns` bricks, every other row shifted by half a brick, with darker mortar
+# between them. Every brick gets a slightly different shade and all of them a fine grain
+def bricks(size, color, rng, rows=4, columns=2, mortar=2):
+    y, x = np.mgrid[0:size, 0:size]
+    brick_height = size // rows
+    brick_width = size // columns
+    row = y // brick_height
+    shifted = x + (row % 2) * (brick_width // 2)
+    col = shifted // brick_width % columns
+
+    shade = rng.uniform(0.75, 1.05, (rows, columns))[row % rows, col]
+    shade *= rng.uniform(0.9, 1.0, (size, size))
+    is_mortar = (y % brick_height < mortar) | (shifted % brick_width < mortar)
+    shade[is_mortar] = 0.45
+    return shade[..., None] * color
+
+
+# irregular stones (the cells of a Voronoi diagram of points jittered around a stones x stones
+# grid) with mortar where two cells meet, darker toward their edges. Distances wrap around the
+# texture so it tiles
+def stone(size, color, rng, stones=4, mortar=1.5):
+    y, x = np.mgrid[0:size, 0:size] + 0.5  # pixel centers
+    corners = np.mgrid[0:stones, 0:stones].reshape(2, -1).T
+    points = (corners + rng.uniform(0.15, 0.85, corners.shape)) * (size / stones)
+    stones = len(points)
+    dy = np.abs(y[..., None] - points[:, 0])
+    dx = np.abs(x[..., None] - points[:, 1])
+    distance = np.hypot(np.minimum(dy, size - dy), np.minimum(dx, size - dx))
+
+    nearest = np.partition(distance, 1, axis=-1)
+    cell = np.argmin(distance, axis=-1)
+    shade = rng.uniform(0.7, 1.05, stones)[cell] * (1 - 0.3 * nearest[..., 0] / nearest[..., 0].max())
+    shade[nearest[..., 1] - nearest[..., 0] < mortar] = 0.35
+    return shade[..., None] * color
+
+
+# value noise: octaves of random values on ever finer lattices, smoothly interpolated between
+# the lattice points (wrapping around, so it tiles) and added up with halving weights
+def noise(size, color, rng, octaves=4, cells=4):
+    total = np.zeros((size, size))
+    weight = 1.0
+    for octave in range(octaves):
+        count = cells << octave
+        lattice = rng.random((count, count))
+
+        # lattice cells of every row/column and how far along them it is, smoothstepped
+        position = (np.arange(size) + 0.5) * count / size - 0.5
+        first = np.floor(position).astype(np.intp)
+        t = position - first
+        t = t * t * (3 - 2 * t)
+        first %= count
+        second = (first + 1) % count
+
+        top = lattice[first[:, None], first] * (1 - t) + lattice[first[:, None], second] * t
+        bottom = lattice[second[:, None], first] * (1 - t) + lattice[second[:, None], second] * t
+        total += weight * (top * (1 - t[:, None]) + bottom * t[:, None])
+        weight /= 2
+
+    total = (total - total.min()) / (total.max() - total.min())
+    return (0.55 + 0.55 * total)[..., None] * color
+
+
+TEXTURE_FAMILIES = {"bricks": bricks, "stone": stone, "noise": noise}
+
+
+# The textures of every wall type of `colors` (wall type -> base color, like WALL_COLORS) in
+# one atlas: the family of every wall type comes from `families` (noise for the ones it
+# doesn't have), every texture is drawn in the color of its wall type. `regions` has the
+# rectangle of the atlas every wall type's texture is in.
+class TextureAtlas:
+    def __init__(self, colors, families=WALL_TEXTURE_FAMILIES, size=TEXTURE_SIZE, seed=TEXTURE_SEED, cache_dir=TEXTURE_CACHE_DIR):
+        began = time.perf_counter()
+        self.size = size
+        self.specs = [(wall_type, families.get(wall_type, "noise"), tuple(colors[wall_type])) for wall_type in sorted(colors)]
+        self.regions = {wall_type: pygame.Rect(i * size, 0, size, size) for i, (wall_type, _, _) in enumerate(self.specs)}
+
+        # everything the pixels depend on
+        parameters = [TEXTURE_VERSION, size, seed, self.specs]
+        self.key = hashlib.sha256(json.dumps(parameters).encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"atlas-{self.key}.png") if cache_dir else None
+
+        # whether the atlas came from the cache, and seconds it took to load or generate
+        self.cached = False
+        self.surface = self._load()
+        if self.surface is None:
+            self.surface = pygame.surfarray.make_surface(self.generate(seed))
+            self._save()
+        self.elapsed = time.perf_counter() - began
+
+    # the atlas pixels as an (x, y, channel) array, the layout of pygame.surfarray
+    def generate(self, seed):
+        pixels = np.zeros((len(self.specs) * self.size, self.size, 3), dtype=np.uint8)
+        for (wall_type, family, color), region in zip(self.specs, self.regions.values()):
+            # (one generator per wall type, so a texture doesn't change when others are added)
+            rng = np.random.default_rng([seed, wall_type])
+            texture = TEXTURE_FAMILIES[family](self.size, np.array(color, dtype=np.float64), rng)
+            pixels[region.x : region.right] = np.clip(texture, 0, 255).astype(np.uint8).swapaxes(0, 1)
+        return pixels
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            surface = pygame.image.load(self.path)
+        except pygame.error:
+            return None
+        if surface.get_size() != (len(self.specs) * self.size, self.size):
+            return None
+        self.cached = True
+        return surface
+
+    # (written under another name and renamed, so a half written atlas is never loaded)
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        partial = os.path.join(os.path.dirname(self.path), f".{os.getpid()}-{os.path.basename(self.path)}")
+        pygame.image.save(self.surface, partial)
+        os.replace(partial, self.path)
+
+    # the texture of every wall type as a surface of its own, in the display format (the
+    # display has to be set up)
+    def textures(self):
+        return {wall_type: self.surface.subsurface(region).convert() for wall_type, region in self.regions.items()}
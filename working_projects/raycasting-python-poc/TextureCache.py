@@ -0,0 +1,122 @@
+from collections import OrderedDict
+import numpy as np
+import pygame
+from settings import *
+from ShadeTable import shaded_copies
+from MipMap import mip_chain, mip_x
+
+# Cache of scaled texture columns for Raycaster.render.
+# Every texture gets a mip chain (see MipMap), every mip level is darkened to the shade levels
+# (see ShadeTable) and cut into 1px wide column strips once, when it is loaded. Scaled columns
+# are kept in an LRU cache keyed by (texture id, shade level, mip level, texture_x, quantized
+# line height, width) that is bounded by the memory its surfaces use and by a number of
+# columns, so a column that was already drawn at a given height costs one dict lookup instead
+# of a subsurface and a transform.scale. Columns taller than the screen are built from the
+# texels of the rows that are on it only, so a wall right in front of the camera never scales
+# a column thousands of pixels tall.
+class TextureColumnCache:
+    def __init__(
+        self, textures, max_bytes=COLUMN_CACHE_BYTES, height_quantum=COLUMN_HEIGHT_QUANTUM,
+        levels=SHADE_LEVELS, max_height=WINDOW_HEIGHT, max_entries=COLUMN_CACHE_ENTRIES,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.height_quantum = height_quantum
+        self.max_height = max_height
+
+        # pre-sliced 1px column strips of every mip level of every shade level of every texture
+        self.strips = {}
+        self.mip_widths = {}
+        for texture_id, texture in textures.items():
+            chain = mip_chain(texture)
+            self.mip_widths[texture_id] = [mip.get_width() for mip in chain]
+            self.strips[texture_id] = [
+                [[shaded.subsurface(x, 0, 1, shaded.get_height()).copy() for x in range(shaded.get_width())] for shaded in mips]
+                for mips in zip(*(shaded_copies(mip, levels) for mip in chain))
+            ]
+        self.widths = {texture_id: texture.get_width() for texture_id, texture in textures.items()}
+
+        self.columns = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # height the columns are actually scaled to for a given line height
+    def quantize(self, line_height):
+        return max(1, int(line_height) // self.height_quantum * self.height_quantum)
+
+    # column texture_x of texture texture_id at shade level `level` (the undarkened texture by
+    # default) and mip level `mip`, scaled to (width, quantize(line_height)). A column taller
+    # than max_height is cut to the rows that are on the screen when it is centered on it, it
+    # has to be drawn at the top of the screen then
+    def get(self, texture_id, texture_x, line_height, width=1, level=-1, mip=0):
+        texture_x = mip_x(texture_x, self.widths[texture_id], self.mip_widths[texture_id][mip])
+        key = (texture_id, level, mip, texture_x, self.quantize(line_height), width)
+        column = self.columns.get(key)
+        if column is not None:
+            self.hits += 1
+            self.columns.move_to_end(key)
+            return column
+
+        self.misses += 1
+        strip = self.strips[texture_id][level][mip][texture_x]
+        height = key[4]
+        if height > self.max_height:
+            column = self._clipped(strip, width, height)
+        else:
+            column = pygame.transform.scale(strip, (width, height))
+        self.columns[key] = column
+        self.bytes += self._size(column)
+
+        # evict the least recently used columns until we are under the budget again
+        while (self.bytes > self.max_bytes or len(self.columns) > self.max_entries) and len(self.columns) > 1:
+            _, evicted = self.columns.popitem(last=False)
+            self.bytes -= self._size(evicted)
+            self.evictions += 1
+
+        return column
+
+    # the rows of `strip` scaled to `height` that are on the screen when it is centered on it.
+    # Row y of a scaled column shows texel y * strip_height // height (the same rows
+    # transform.scale picks), so only the texels of the visible rows are read and the column is
+    # never taller than max_height
+    def _clipped(self, strip, width, height):
+        strip_height = strip.get_height()
+        skip = -int(self.max_height / 2 - height / 2)
+        texel_rows = np.arange(skip, skip + min(height - skip, self.max_height)) * strip_height // height
+        first = int(texel_rows[0])
+        texels = pygame.surfarray.array2d(strip.subsurface(0, first, 1, int(texel_rows[-1]) - first + 1))
+
+        column = pygame.Surface((1, len(texel_rows)), 0, strip)
+        pygame.surfarray.blit_array(column, texels[:, texel_rows - first])
+        return pygame.transform.scale(column, (width, len(texel_rows))) if width > 1 else column
+
+    def _size(self, surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self.columns),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
+
+    # starts counting hits, misses and evictions from zero, the cached columns stay
+    def reset_counts(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.columns.clear()
+        self.bytes = 0
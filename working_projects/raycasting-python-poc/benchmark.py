@@ -0,0 +1,454 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+
+# no window needed, SDL draws into memory. This has to be set before pygame opens a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+# keep stdout clean for the JSON report
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+import settings
+
+# exit code of a --verify run whose rays differ from a full recast (a crash exits with 1)
+VERIFY_FAILED = 3
+
+try:
+    import resource
+except ImportError:  # not on Windows, the report has no peak memory there
+    resource = None
+
+# Headless benchmark of the game loop: drives the player with a scripted autopilot or recorded
+# inputs for a fixed number of frames and reports per stage frame times as JSON, e.g.
+#   python3 benchmark.py --res 1 --frames 600 --path wander --output bench.json
+# Frames are drawn as fast as they can be, but the game logic sees every frame take
+# --frame-ms, so every run takes the same path whatever the frame rate is.
+
+# the game modules copy the settings with `from settings import *` when they are imported,
+# so they have to be changed before the first import of any of them
+def configure(args):
+    settings.WINDOW_WIDTH = args.width
+    settings.WINDOW_HEIGHT = args.height
+    settings.RES = args.res
+    settings.NUM_RAYS = args.width // args.res
+    settings.RENDERER = args.renderer
+    settings.CAST_WORKERS = args.workers
+    settings.MAP_FILE = args.map
+    settings.SKIP_EMPTY_SPACE = args.skip
+    settings.TEMPORAL_REUSE = not args.no_reuse
+    settings.FLOOR_CASTING = not args.no_floor
+    settings.PIPELINED_CASTING = args.pipeline
+    settings.DYNAMIC_RESOLUTION = args.dynamic
+    settings.FRAME_BUDGET_MS = args.budget
+    settings.RES_MIN = args.res_min
+    settings.RES_MAX = args.res_max
+    settings.TICK_RATE = args.tick_rate
+    settings.WORLD_CACHE_BYTES = int(args.world_cache * 1024 * 1024)
+    settings.COLUMN_CACHE_ENTRIES = args.column_cache_entries
+    settings.COLUMN_CACHE_BYTES = int(args.column_cache_mb * 1024 * 1024)
+
+
+# autopilots, they compute the controls from the player's state so every run takes the same path
+
+# turns on the spot
+def spin(player, map):
+    return 1, 0
+
+
+# walks straight ahead and turns right for as long as there's a wall in front
+def wander(player, map):
+    look_ahead = player.moveSpeed * 8
+    x = player.x + math.cos(player.rotationAngle) * look_ahead
+    y = player.y + math.sin(player.rotationAngle) * look_ahead
+    if map.has_wall_at(x, y):
+        return 1, 0
+    return 0, 1
+
+
+PATHS = {"spin": spin, "wander": wander}
+
+
+# casts all the columns of the raycaster's last frame again from scratch into `buffer` and
+# returns the largest distance difference, the number of columns that hit something else and
+# the number of columns that hit the other face of the same corner. The last ones are rays
+# through the corner of a tile, where both faces are equally close and directions a rounding
+# error apart can pick either of them (their distances differ by up to the 0.01 pixel the
+# caster moves its grid lines by)
+def check_rays(raycaster, buffer):
+    from BatchCaster import cast_rays
+
+    player = raycaster.player
+    buffer.resize(raycaster.num_rays)
+    # (at the rotation they were cast for, rays reused after turning may be up to
+    # REUSE_TOLERANCE off the player's, which is enough to tip rays exactly through corners)
+    rotation = raycaster.pose[2] if raycaster.pose else player.rotationAngle
+    dir_x, dir_y = raycaster.camera.rotate(rotation)
+    # (stepping through every tile, so a run with --skip is checked against the plain DDA)
+    cast_rays(raycaster.map, player.x, player.y, dir_x, dir_y, buffer, skip=False)
+    rays = raycaster.rays
+    error = np.abs(buffer.length * raycaster.camera.fisheye - rays.distance)
+    same_wall = buffer.wall_type == rays.wall_type
+    ties = same_wall & (buffer.hit_vertical != rays.hit_vertical) & (error < 0.02)
+    mismatched = ~ties & (~same_wall | (error > 1e-6))
+    return float(error[~ties].max(initial=0)), int(mismatched.sum()), int(ties.sum())
+
+
+# checksum of the pixels of a surface, to tell whether two frames look exactly the same
+def frame_checksum(surface):
+    return hashlib.sha256(pygame.image.tobytes(surface, "RGB")).hexdigest()[:16]
+
+
+def run(args):
+    configure(args)
+
+    from Map import Map
+    from Player import Player
+    from Raycaster import Raycaster
+    from FrameRenderer import FrameRenderer
+    from Profiler import Profiler
+    from Minimap import Minimap
+    from main import STAGES, draw_hud
+    from RayBuffer import RayBuffer
+    from ResolutionController import ResolutionController
+    from Sprites import Sprites
+    from FloorCaster import FloorCaster
+    from CastPipeline import CastPipeline
+    from FixedTimestep import FixedTimestep
+    from InputLog import InputLog
+    from ChunkedMap import ChunkedMap
+
+    pygame.init()
+    screen = pygame.display.set_mode((args.width, args.height))
+
+    # a replayed input log is played on its own map (unless there's --map) from where it started
+    replay = InputLog.load(args.inputs) if args.inputs else None
+    map_file = args.map or (replay.map_file if replay else None)
+    map = Map.load(map_file) if map_file else Map()
+    player = Player(*map.spawn_point())
+    if replay:
+        replay.place(player)
+    timestep = FixedTimestep()
+    view = Player(*map.spawn_point())
+    raycaster = Raycaster(view, map)
+    minimap = Minimap(map)
+    sprites = Sprites.scatter(map, args.sprites)
+    floors = FloorCaster(raycaster) if not args.no_floor else None
+    renderer = FrameRenderer(raycaster, floors=floors) if args.renderer == "surfarray" else raycaster
+    pipeline = CastPipeline(raycaster) if args.pipeline else None
+    font = pygame.font.SysFont("Arial", 18)
+
+    # points in the middle of random empty tiles that check every frame whether they can see the player
+    watchers = Sprites.scatter(map, args.los, seed=1)
+    los_ms = []
+    visible = []
+
+    autopilot = PATHS[args.path]
+    record = InputLog(map_file=map_file, tick_rate=args.tick_rate, start=(player.x, player.y, player.rotationAngle)) if args.record else None
+
+    # frames whose pixels are checksummed (and saved to --frames-dir) after the 3D view is drawn
+    checksum_frames = set(args.checksum_frames)
+    checksums = {}
+    if args.frames_dir:
+        os.makedirs(args.frames_dir, exist_ok=True)
+
+    profiler = Profiler(STAGES, history=args.frames, enabled=True)
+    resolution = ResolutionController() if args.dynamic else None
+    cast_stage = profiler.index["cast"]
+    render_stage = profiler.index["render"]
+
+    passes = []
+    lookups = []
+    reused = []
+    rays = []
+    resolutions = []
+    floor_ms = []
+    # when every frame's update stage ended, and from there to the frame drawn from it being
+    # presented (with the pipeline that's the frame after)
+    updated = []
+    latency_ms = []
+    ages_ms = []
+    waited_ms = []
+    check = RayBuffer() if args.verify else None
+    # the casting workers (the pipeline's casting thread uses them if there is one), and the
+    # seconds every worker spent on its strip in every measured frame that was cast by them
+    parallel = raycaster.parallel or (pipeline.caster.parallel if pipeline else None)
+    strip_times = []
+    parallel_casts = 0
+    max_error = 0.0
+    mismatched = 0
+    corner_ties = 0
+    ticks = []
+
+    for frame in range(args.warmup + args.frames):
+        if frame == args.warmup:
+            profiler.reset()
+            raycaster.columns.reset_counts()
+            if args.trace:
+                profiler.toggle_trace(args.trace)
+
+        profiler.begin_frame()
+
+        frame_ticks = timestep.advance(args.frame_ms / 1000)
+        for tick in range(timestep.ticks - frame_ticks, timestep.ticks):
+            if replay:
+                controls = replay.controls[tick % len(replay.controls)]
+            else:
+                controls = autopilot(player, map)
+            if record:
+                record.record(controls)
+            player.update(controls)
+        player.interpolate(timestep.alpha, view)
+        if args.los:
+            began = time.perf_counter()
+            blocked = map.line_of_sight(watchers.x, watchers.y, player.x, player.y)[0]
+            if frame >= args.warmup:
+                los_ms.append((time.perf_counter() - began) * 1000)
+                visible.append(len(blocked) - int(blocked.sum()))
+        profiler.mark("update")
+        updated.append(time.perf_counter())
+
+        if pipeline:
+            pipeline.cast()
+        else:
+            raycaster.castAllRays()
+        profiler.mark("cast")
+        if frame >= args.warmup:
+            passes.append(raycaster.cast_stats[0])
+            lookups.append(raycaster.cast_stats[1])
+            reused.append(raycaster.reused)
+            rays.append(raycaster.num_rays)
+            resolutions.append(raycaster.res)
+            ticks.append(frame_ticks)
+            if pipeline:
+                ages_ms.append(pipeline.latency * 1000)
+                waited_ms.append(pipeline.waited * 1000)
+            if parallel and parallel.casts != parallel_casts:
+                strip_times.append(parallel.strip_times)
+        if parallel:
+            parallel_casts = parallel.casts
+        if check is not None:
+            # outside of the profiled stages
+            error, columns, ties = check_rays(raycaster, check)
+            max_error = max(max_error, error)
+            mismatched += columns
+            corner_ties += ties
+            profiler.last = time.perf_counter()
+
+        screen.fill((0, 0, 0))
+        if floors and renderer is raycaster:
+            floors.render(screen)
+        renderer.render(screen)
+        sprites.render(screen, raycaster)
+        profiler.mark("render")
+        if floors and frame >= args.warmup:
+            floor_ms.append(floors.elapsed * 1000)
+        if resolution:
+            raycaster.set_resolution(resolution.update(profiler.current[cast_stage] + profiler.current[render_stage]))
+        if frame in checksum_frames:
+            # (the 3D view only, the minimap and the HUD come after. Outside of the profiled stages)
+            checksums[str(frame)] = frame_checksum(screen)
+            if args.frames_dir:
+                pygame.image.save(screen, os.path.join(args.frames_dir, f"frame-{frame}.png"))
+            profiler.last = time.perf_counter()
+
+        minimap.render(screen, raycaster.player, raycaster.rays)
+        profiler.mark("minimap")
+
+        fps = 1000 / profiler.samples[(profiler.frames - 1) % profiler.history].sum() if profiler.frames else 0
+        draw_hud(screen, font, int(fps), player, raycaster, pipeline)
+        profiler.mark("hud")
+
+        pygame.display.update()
+        profiler.mark("present")
+        profiler.end_frame()
+        if frame >= args.warmup:
+            shown = updated[frame - 1] if pipeline and frame else updated[frame]
+            latency_ms.append((time.perf_counter() - shown) * 1000)
+
+    if args.trace:
+        profiler.toggle_trace(args.trace)
+    if record:
+        record.save(args.record)
+    if pipeline:
+        pipeline.close()
+    raycaster.close()
+    pygame.quit()
+
+    summary = profiler.summary()
+    report = {
+        "config": {
+            "map": map_file or "built-in",
+            "width": args.width,
+            "height": args.height,
+            "res": args.res,
+            "num_rays": args.width // args.res,
+            "renderer": args.renderer,
+            "workers": args.workers,
+            "sprites": args.sprites,
+            "line_of_sight_queries": args.los,
+            "floor_casting": not args.no_floor,
+            "skip_empty_space": args.skip,
+            "temporal_reuse": not args.no_reuse,
+            "dynamic_resolution": args.dynamic,
+            "pipelined_casting": args.pipeline,
+            "path": args.inputs or args.path,
+            "tick_rate": args.tick_rate,
+            "frame_ms": args.frame_ms,
+            "frames": args.frames,
+            "warmup": args.warmup,
+        },
+        # lock-step passes of the caster and grid lookups of all the rays, per frame
+        "cast_steps": {
+            "passes": sum(passes) / len(passes),
+            "lookups": sum(lookups) / len(lookups),
+            "lookups_per_ray": sum(lookups) / sum(rays),
+            "reused_columns": sum(reused) / len(reused),
+        },
+        # column width in pixels of the measured frames: the one of the last frame, the mean,
+        # and how many frames were cast at each width
+        "resolution": {
+            "final": raycaster.res,
+            "mean": sum(resolutions) / len(resolutions),
+            "frames": {str(res): resolutions.count(res) for res in sorted(set(resolutions))},
+            "changes": resolution.changes if resolution else 0,
+        },
+        # game logic ticks run per measured frame, and ticks dropped after slow frames
+        "simulation": {
+            "ticks": sum(ticks),
+            "ticks_per_frame": sum(ticks) / len(ticks),
+            "dropped": timestep.dropped,
+        },
+        # the wall texture atlas: whether it came from its cache and ms it took to load or generate
+        "textures": {
+            "atlas_cached": raycaster.atlas.cached,
+            "atlas_ms": raycaster.atlas.elapsed * 1000,
+            "wall_types": len(raycaster.atlas.regions),
+        },
+        # the scaled texture column cache over the measured frames (the columns renderer draws
+        # from it), to size COLUMN_CACHE_ENTRIES and COLUMN_CACHE_BYTES
+        "column_cache": raycaster.columns.stats(),
+        "frame": summary.pop("frame"),
+        "stages": summary,
+        # from applying the controls to presenting the frame that shows them. With the pipeline
+        # also how old the rays were when their frame was drawn and how long the main thread
+        # waited for the casting thread (that's the cast stage)
+        "latency": {
+            "mean_ms": sum(latency_ms) / len(latency_ms),
+            "p95_ms": float(np.percentile(latency_ms, 95)),
+        },
+    }
+    if parallel:
+        # time every worker took for its strip (p50 and worst over the frames the workers cast),
+        # to compare how the casting scales with the number of workers
+        strip_ms = np.array(strip_times).reshape(-1, args.workers) * 1000
+        report["parallel"] = {
+            "workers": args.workers,
+            "frames_cast": len(strip_ms),
+            "strip_ms": [
+                {"p50_ms": float(np.percentile(ms, 50)), "max_ms": float(ms.max())} for ms in strip_ms.T
+            ] if len(strip_ms) else [],
+        }
+    if pipeline:
+        report["latency"]["pose_age_ms"] = sum(ages_ms) / len(ages_ms)
+        report["latency"]["cast_wait_ms"] = sum(waited_ms) / len(waited_ms)
+    if floors:
+        # floor and ceiling casting (part of the render stage), per frame and per megapixel of
+        # the window it covers
+        megapixels = args.width * args.height / 1e6
+        report["floor"] = {
+            "mean_ms": sum(floor_ms) / len(floor_ms),
+            "p95_ms": float(np.percentile(floor_ms, 95)),
+            "megapixels": megapixels,
+            "ms_per_megapixel": sum(floor_ms) / len(floor_ms) / megapixels,
+        }
+    if args.los:
+        # the line of sight queries (part of the update stage), per frame
+        report["line_of_sight"] = {
+            "queries": args.los,
+            "mean_ms": sum(los_ms) / len(los_ms),
+            "p95_ms": float(np.percentile(los_ms, 95)),
+            "us_per_query": sum(los_ms) / len(los_ms) / args.los * 1000,
+            "visible": sum(visible) / len(visible),
+        }
+    if isinstance(map, ChunkedMap):
+        # chunks of the world paged in and evicted over the whole run, and how many fit in the cache
+        report["world"] = {
+            "tiles": map.cols * map.rows,
+            "chunk": map.chunk,
+            "cache_chunks": len(map.chunk_of),
+            "resident_chunks": len(map.chunk_of) - map.free,
+            "loads": map.loads,
+            "evictions": map.evictions,
+        }
+    if resource:
+        # peak resident memory of the process over the whole run (Linux reports it in kB)
+        report["memory"] = {"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    if checksum_frames:
+        report["checksums"] = checksums
+    if check is not None:
+        # every frame compared with a full recast of all the columns
+        report["verify"] = {
+            "max_distance_error": max_error,
+            "mismatched_columns": mismatched,
+            "corner_ties": corner_ties,
+        }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmark of the raycaster")
+    parser.add_argument("--map", help=".rcmap or .rcworld file to play on, the built-in map by default")
+    parser.add_argument("--world-cache", type=float, default=settings.WORLD_CACHE_BYTES / (1024 * 1024), help="MB of chunks a .rcworld map keeps in memory")
+    parser.add_argument("--width", type=int, default=settings.WINDOW_WIDTH)
+    parser.add_argument("--height", type=int, default=settings.WINDOW_HEIGHT)
+    parser.add_argument("--res", type=int, default=settings.RES, help="column width in pixels (the starting one with --dynamic)")
+    parser.add_argument("--renderer", choices=("columns", "surfarray"), default=settings.RENDERER)
+    parser.add_argument("--workers", type=int, default=settings.CAST_WORKERS, help="casting worker processes")
+    parser.add_argument("--pipeline", action="store_true", help="cast the next frame while drawing this one")
+    parser.add_argument("--no-floor", action="store_true", help="flat colored floor and ceiling")
+    parser.add_argument("--sprites", type=int, default=settings.SPRITE_COUNT, help="sprites scattered over the map")
+    parser.add_argument("--los", type=int, default=0, help="line of sight queries to the player per frame")
+    parser.add_argument("--dynamic", action="store_true", help="adapt the column width to hold --budget")
+    parser.add_argument("--budget", type=float, default=settings.FRAME_BUDGET_MS, help="ms of casting and rendering per frame")
+    parser.add_argument("--res-min", type=int, default=settings.RES_MIN)
+    parser.add_argument("--res-max", type=int, default=settings.RES_MAX)
+    parser.add_argument("--column-cache-entries", type=int, default=settings.COLUMN_CACHE_ENTRIES, help="most scaled texture columns kept")
+    parser.add_argument("--column-cache-mb", type=float, default=settings.COLUMN_CACHE_BYTES / (1024 * 1024), help="MB of scaled texture columns kept")
+    parser.add_argument("--skip", action=argparse.BooleanOptionalAction, default=settings.SKIP_EMPTY_SPACE, help="let rays jump through open space (SKIP_EMPTY_SPACE)")
+    parser.add_argument("--no-reuse", action="store_true", help="cast every column every frame")
+    parser.add_argument("--verify", action="store_true", help="compare every frame's rays with a full recast, exit with VERIFY_FAILED (3) if any column differs")
+    parser.add_argument("--path", choices=sorted(PATHS), default="wander", help="scripted autopilot")
+    parser.add_argument("--inputs", help="input log to replay (see InputLog), replaces the autopilot")
+    parser.add_argument("--record", help="write the controls of every tick to this input log")
+    parser.add_argument("--checksum-frames", type=int, nargs="*", default=[], help="frames (counting the warmup) to report pixel checksums of")
+    parser.add_argument("--frames-dir", help="also save the checksummed frames to this folder as frame-<n>.png")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--tick-rate", type=int, default=settings.TICK_RATE, help="game logic ticks per second")
+    parser.add_argument("--frame-ms", type=float, help="game time every frame takes, one tick by default")
+    parser.add_argument("--warmup", type=int, default=30, help="frames run before measuring")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--trace", help="also write every frame's stage times to this JSON lines file")
+    args = parser.parse_args(argv)
+    if args.frame_ms is None:
+        args.frame_ms = 1000 / args.tick_rate
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run(args)
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    if args.verify and result["verify"]["mismatched_columns"]:
+        # the rays drawn differ from a full recast, fail the run (after the report is out)
+        print(f"{result['verify']['mismatched_columns']} columns differ from a full recast", file=sys.stderr)
+        sys.exit(VERIFY_FAILED)
@@ -0,0 +1,85 @@
+import argparse
+import numpy as np
+from settings import *
+from Map import Map
+from ChunkedMap import chunk_grid, write_world
+
+# Generates large maps in the .rcmap format, or worlds in the chunked .rcworld format, e.g.
+#   python3 gen_map.py --size 1024 --kind maze maze1024.rcmap
+#   python3 gen_map.py --size 100000 --kinds 256 world100k.rcworld
+# and then set MAP_FILE = "maze1024.rcmap" in settings.py
+
+
+# open map with randomly scattered pillars
+def open_map(size, rng, density=0.02):
+    grid = (rng.random((size, size)) < density).astype(np.uint8)
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 1
+    return grid
+
+
+# perfect maze with corridors one tile wide (iterative depth-first search)
+def maze_map(size, rng):
+    cells = (size - 1) // 2
+    grid = np.ones((size, size), dtype=np.uint8)
+    visited = np.zeros((cells, cells), dtype=bool)
+
+    stack = [(0, 0)]
+    visited[0, 0] = True
+    grid[1, 1] = 0
+    while stack:
+        row, col = stack[-1]
+        neighbours = [
+            (row + dr, col + dc) for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))
+            if 0 <= row + dr < cells and 0 <= col + dc < cells and not visited[row + dr, col + dc]
+        ]
+        if not neighbours:
+            stack.pop()
+            continue
+        next_row, next_col = neighbours[int(rng.integers(len(neighbours)))]
+        visited[next_row, next_col] = True
+        # open the cell and the wall between both cells
+        grid[2 * next_row + 1, 2 * next_col + 1] = 0
+        grid[row + next_row + 1, col + next_col + 1] = 0
+        stack.append((next_row, next_col))
+    return grid
+
+
+# `kinds` random chunks for a world too big to generate as one grid: pillars like open_map, or
+# pieces of maze with a doorway in their top and left walls so that they connect (their right
+# and bottom walls are the top and left walls of the next chunks)
+def random_chunks(kinds, kind, rng, chunk=WORLD_CHUNK, density=0.02):
+    if kind == "open":
+        return (rng.random((kinds, chunk, chunk)) < density).astype(np.uint8)
+    blocks = np.stack([maze_map(chunk + 1, rng)[:chunk, :chunk] for _ in range(kinds)])
+    blocks[:, 0, chunk // 2 | 1] = 0
+    blocks[:, chunk // 2 | 1, 0] = 0
+    return blocks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a .rcmap map file or a .rcworld world file")
+    parser.add_argument("output")
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--kind", choices=("open", "maze"), default="open")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--world", action="store_true", help="save a chunked .rcworld file")
+    parser.add_argument("--kinds", type=int, help="build a .rcworld file out of this many random chunks instead of one grid, for worlds too big for memory")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.kinds:
+        chunks = -(-args.size // WORLD_CHUNK)
+        blocks = random_chunks(args.kinds, args.kind, rng)
+        index = rng.integers(args.kinds, size=(chunks, chunks), dtype=np.uint32)
+        write_world(args.output, args.size, args.size, blocks, index)
+        print(f"{args.kind} world of {args.size}x{args.size} tiles out of {args.kinds} chunks saved as {args.output}")
+        raise SystemExit
+
+    grid = maze_map(args.size, rng) if args.kind == "maze" else open_map(args.size, rng)
+    if args.world:
+        blocks, index = chunk_grid(grid)
+        write_world(args.output, args.size, args.size, blocks, index)
+        print(f"{args.kind} world of {args.size}x{args.size} tiles ({len(blocks)} distinct chunks) saved as {args.output}")
+    else:
+        Map(grid).save(args.output)
+        print(f"{args.kind} map of {args.size}x{args.size} tiles saved as {args.output}")
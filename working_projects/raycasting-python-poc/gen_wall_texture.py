@@ -1,21 +1,25 @@
+import argparse
+import os
 import pygame
+from TextureAtlas import TextureAtlas
+from Raycaster import WALL_COLORS
 
-pygame.init()
-size = 64
-surface = pygame.Surface((size, size))
+# Generates the textures of every wall type (see TextureAtlas and WALL_TEXTURE_FAMILIES in
+# settings.py) into the atlas cache ahead of time and saves every texture as wall<type>.png to
+# look at, e.g.
+#   python3 gen_wall_texture.py --output textures
 
-# Fill with base color
-surface.fill((180, 60, 40))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the wall texture atlas")
+    parser.add_argument("--output", default=".", help="folder for the wall<type>.png files")
+    args = parser.parse_args()
 
-# Draw horizontal brick lines
-for y in range(0, size, 16):
-    pygame.draw.line(surface, (120, 30, 20), (0, y), (size, y), 3)
+    atlas = TextureAtlas(WALL_COLORS)
+    state = "loaded from the cache" if atlas.cached else f"generated in {atlas.elapsed * 1000:.1f} ms"
+    print(f"atlas of {len(atlas.regions)} textures {state}: {atlas.path}")
 
-# Draw vertical brick lines (offset every other row)
-for y in range(0, size, 32):
-    for x in range(0, size, 32):
-        pygame.draw.line(surface, (120, 30, 20), (x, y), (x, y + 16), 3)
-        pygame.draw.line(surface, (120, 30, 20), (x + 16, y + 16), (x + 16, y + 32), 3)
-
-pygame.image.save(surface, "wall1.png")
-print("Texture saved as wall1.png")
+    os.makedirs(args.output, exist_ok=True)
+    for wall_type, region in atlas.regions.items():
+        path = os.path.join(args.output, f"wall{wall_type}.png")
+        pygame.image.save(atlas.surface.subsurface(region), path)
+        print(f"Texture saved as {path}")
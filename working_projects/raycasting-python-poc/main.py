@@ -1,55 +1,175 @@
+import time
 import pygame
 from settings import *
 from Map import *
 from Player import *
 from Raycaster import *
+from FrameRenderer import FrameRenderer
+from Profiler import Profiler
+from Minimap import Minimap
+from ResolutionController import ResolutionController
+from Sprites import Sprites
+from FloorCaster import FloorCaster
+from CastPipeline import CastPipeline
+from FixedTimestep import FixedTimestep
+from InputLog import InputLog
 
-pygame.init()  # Initialize Pygame
+# the stages of a frame, as timed by the Profiler
+STAGES = ("update", "cast", "render", "minimap", "hud", "present")
 
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 
-map = Map()
-player = Player()
-raycaster = Raycaster(player, map)
+def draw_hud(screen, font, fps, player, raycaster, pipeline=None):
+    # Draw FPS counter
+    fps_text = font.render(f"FPS: {fps}", True, (255, 255, 0))
+    screen.blit(fps_text, (MINIMAP_SIZE + 20, 10))
 
-# background_image = pygame.image.load("background.png")
+    # Draw player position
+    pos_text = font.render(f"Pos: ({int(player.x)}, {int(player.y)})", True, (255, 255, 255))
+    screen.blit(pos_text, (MINIMAP_SIZE + 20, 30))
 
-clock = pygame.time.Clock()
+    # Draw texture column cache usage
+    cache = raycaster.columns
+    cache_text = font.render(f"Column cache: {cache.hit_rate():.0%} hits, {cache.bytes / 1e6:.1f} MB", True, (255, 255, 255))
+    screen.blit(cache_text, (MINIMAP_SIZE + 20, 50))
 
-font = pygame.font.SysFont("Arial", 18)
+    # Draw the resolution the view is cast at
+    res_text = font.render(f"Res: {raycaster.res} px ({raycaster.num_rays} rays)", True, (255, 255, 255))
+    screen.blit(res_text, (MINIMAP_SIZE + 20, 70))
 
-MINIMAP_SIZE = 200  # pixels
+    # Draw how long every casting worker took for its strip
+    if raycaster.parallel:
+        strips = " / ".join(f"{t * 1000:.1f}" for t in raycaster.parallel.strip_times)
+        strips_text = font.render(f"Strips (ms): {strips}", True, (255, 255, 255))
+        screen.blit(strips_text, (MINIMAP_SIZE + 20, 90))
 
-while True:
-    clock.tick(60)
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            exit()
-    
-    player.update()
-    raycaster.castAllRays()
+    # Draw how old the rays were when the cast pipeline handed them over
+    if pipeline:
+        pipeline_text = font.render(f"Pipeline: rays {pipeline.latency * 1000:.1f} ms old", True, (255, 255, 255))
+        screen.blit(pipeline_text, (MINIMAP_SIZE + 20, 110))
 
-    # Fill background with black for clarity
-    screen.fill((0, 0, 0))
 
-    # Draw 3D view (raycaster)
-    raycaster.render(screen)
+# the game loop lives in main() so that worker processes (see ParallelCaster) can import
+# this module without starting a game of their own
+def main():
+    pygame.init()  # Initialize Pygame
 
-    # Draw minimap in the top-left corner
-    minimap_surface = pygame.Surface((MINIMAP_SIZE, MINIMAP_SIZE))
-    minimap_surface.fill((30, 30, 30))
-    map.render(minimap_surface)
-    player.render(minimap_surface)
-    screen.blit(minimap_surface, (10, 10))
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 
-    # Draw FPS counter
-    fps = int(clock.get_fps())
-    fps_text = font.render(f"FPS: {fps}", True, (255, 255, 0))
-    screen.blit(fps_text, (MINIMAP_SIZE + 20, 10))
+    # a replayed session is played on its own map, from where it started and at its tick rate
+    replay = InputLog.load(REPLAY_FILE) if REPLAY_FILE else None
+    map_file = replay.map_file if replay else MAP_FILE
+    map = Map.load(map_file) if map_file else Map()
+    player = Player(*map.spawn_point())
+    if replay:
+        replay.place(player)
+
+    # the game logic moves the player in fixed ticks, the frames are drawn from `view`: the
+    # player's pose interpolated to the time of the frame
+    timestep = FixedTimestep(replay.tick_rate) if replay else FixedTimestep()
+    view = Player(*map.spawn_point())
+    raycaster = Raycaster(view, map)
+    minimap = Minimap(map)
+    sprites = Sprites.scatter(map, SPRITE_COUNT)
+
+    # the 3D view is drawn either column by column by the raycaster or in one go by the FrameRenderer
+    floors = FloorCaster(raycaster) if FLOOR_CASTING else None
+    renderer = FrameRenderer(raycaster, floors=floors) if RENDERER == "surfarray" else raycaster
+
+    # casts the next frame in the background while this one is drawn
+    pipeline = CastPipeline(raycaster) if PIPELINED_CASTING else None
+
+    # background_image = pygame.image.load("background.png")
+
+    clock = pygame.time.Clock()
+
+    font = pygame.font.SysFont("Arial", 18)
+
+    # F3 shows the frame time graph, F4 starts/stops writing every frame to a trace file
+    profiler = Profiler(STAGES, enabled=PROFILER_ENABLED)
+
+    # picks the column width from how long casting and rendering take
+    resolution = ResolutionController() if DYNAMIC_RESOLUTION else None
+
+    # the input log being recorded (F5) and the file it goes to
+    recording = None
+    recording_path = None
+
+    def shutdown():
+        if recording:
+            recording.save(recording_path)
+        if pipeline:
+            pipeline.close()
+        raycaster.close()
+        pygame.quit()
+        exit()
+
+    while True:
+        clock.tick(MAX_FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                shutdown()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_overlay()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                profiler.toggle_trace(time.strftime("trace-%Y%m%d-%H%M%S.jsonl"))
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                if recording:
+                    recording.save(recording_path)
+                    recording = None
+                else:
+                    recording = InputLog(map_file=map_file, tick_rate=timestep.rate, start=(player.x, player.y, player.rotationAngle))
+                    recording_path = time.strftime("inputs-%Y%m%d-%H%M%S.json")
+
+        profiler.begin_frame()
+
+        frame_ticks = timestep.advance()
+        for tick in range(timestep.ticks - frame_ticks, timestep.ticks):
+            if replay:
+                controls = replay.replay(tick)
+                if controls is None:
+                    shutdown()
+            else:
+                controls = player.read_controls()
+            if recording:
+                recording.record(controls)
+            player.update(controls)
+        player.interpolate(timestep.alpha, view)
+        profiler.mark("update")
+
+        started = time.perf_counter()
+        if pipeline:
+            pipeline.cast()
+        else:
+            raycaster.castAllRays()
+        profiler.mark("cast")
+
+        # Fill background with black for clarity
+        screen.fill((0, 0, 0))
+
+        # Draw 3D view (raycaster) and the sprites in it. The FrameRenderer draws the floor
+        # itself, for the raycaster it goes under the walls
+        if floors and renderer is raycaster:
+            floors.render(screen)
+        renderer.render(screen)
+        sprites.render(screen, raycaster)
+        profiler.mark("render")
+        if resolution:
+            raycaster.set_resolution(resolution.update((time.perf_counter() - started) * 1000))
+
+        # Draw minimap in the top-left corner
+        # (the pose the rays were cast for, with the pipeline that's where the view was a frame ago)
+        minimap.render(screen, raycaster.player, raycaster.rays)
+        profiler.mark("minimap")
+
+        draw_hud(screen, font, int(clock.get_fps()), player, raycaster, pipeline)
+        if profiler.overlay:
+            profiler.draw(screen, font, 10, WINDOW_HEIGHT - 110)
+        profiler.mark("hud")
+
+        pygame.display.update()
+        profiler.mark("present")
+        profiler.end_frame()
 
-    # Draw player position
-    pos_text = font.render(f"Pos: ({int(player.x)}, {int(player.y)})", True, (255, 255, 255))
-    screen.blit(pos_text, (MINIMAP_SIZE + 20, 30))
 
-    pygame.display.update()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Regression suite for correctness and speed at once: replays the canned input logs in
+# sessions/ (see InputLog) headlessly with benchmark.py, checks the pixels of selected frames
+# against the golden frames in sessions/golden/, the p95 time of every stage against its
+# budget, for the cases run with --verify the rays of every frame against a full recast and,
+# for the cases with a min_reused_columns, that the rays of the last frame are reused, e.g.
+#   python3 regression.py                 checks every case of sessions/regression.json
+#   python3 regression.py --update        takes this run's frames as the new golden ones
+# Every case runs in a process of its own, the settings it changes are read when the game
+# modules are imported. The frames are drawn the same way on every machine with the same
+# SDL and NumPy, the budgets are the p95 times of the machine they were set on with room to
+# spare (--budget-scale gives slower machines more).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SESSIONS = os.path.join(HERE, "sessions")
+CASES = os.path.join(SESSIONS, "regression.json")
+GOLDEN = os.path.join(SESSIONS, "golden")
+
+# exit code of benchmark.py when --verify found columns that differ from a full recast (its
+# VERIFY_FAILED, not imported to keep pygame out of this process)
+VERIFY_FAILED = 3
+
+
+# runs the benchmark for a case and returns its report, the checksummed frames go to frames_dir.
+# A case with --verify in its args makes the benchmark exit with VERIFY_FAILED when the rays it
+# drew differ from a full recast, the report says by how much. Any other failure is raised
+def run_case(case, frames_dir):
+    report_path = os.path.join(frames_dir, "report.json")
+    command = [
+        sys.executable, os.path.join(HERE, "benchmark.py"),
+        "--inputs", os.path.join(SESSIONS, case["inputs"]),
+        "--warmup", str(case["warmup"]),
+        "--frames", str(case["frames"]),
+        "--checksum-frames", *(str(frame) for frame in case["checksum_frames"]),
+        "--frames-dir", frames_dir,
+        "--output", report_path,
+        *case["args"],
+    ]
+    result = subprocess.run(command, cwd=HERE, stdout=subprocess.DEVNULL)
+    if result.returncode and not (result.returncode == VERIFY_FAILED and "--verify" in case["args"]):
+        raise subprocess.CalledProcessError(result.returncode, command)
+    with open(report_path) as f:
+        return json.load(f)
+
+
+# the failures of a case as a list of messages
+def check_case(name, case, report, frames_dir, budget_scale):
+    failures = []
+    for frame in case["checksum_frames"]:
+        expected = case["checksums"].get(str(frame))
+        actual = report["checksums"][str(frame)]
+        if actual != expected:
+            golden = os.path.join(GOLDEN, f"{name}-{frame}.png")
+            failures.append(f"frame {frame} differs from {golden}, it looks like {os.path.join(frames_dir, f'frame-{frame}.png')}")
+
+    # cases that turn the view between ticks must still reuse the rays of the last frame
+    reused = report["cast_steps"]["reused_columns"]
+    if reused < case.get("min_reused_columns", 0):
+        failures.append(f"reused {reused:.1f} columns per frame, fewer than {case['min_reused_columns']}")
+
+    if "verify" in report and report["verify"]["mismatched_columns"]:
+        failures.append(f"{report['verify']['mismatched_columns']} columns differ from a full recast")
+
+    stages = dict(report["stages"], frame=report["frame"])
+    for stage, budget in case["budgets_ms"].items():
+        p95 = stages[stage]["p95_ms"]
+        if p95 > budget * budget_scale:
+            failures.append(f"{stage} took {p95:.2f} ms (p95), over its budget of {budget * budget_scale:.2f} ms")
+    return failures
+
+
+# takes the frames of this run as the golden ones of a case
+def update_case(name, case, report, frames_dir):
+    os.makedirs(GOLDEN, exist_ok=True)
+    case["checksums"] = report["checksums"]
+    for frame in case["checksum_frames"]:
+        shutil.copyfile(os.path.join(frames_dir, f"frame-{frame}.png"), os.path.join(GOLDEN, f"{name}-{frame}.png"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the canned sessions and check their frames and frame times")
+    parser.add_argument("cases", nargs="*", help="names of the cases to run, all of them by default")
+    parser.add_argument("--update", action="store_true", help="take this run's frames as the golden ones")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget by this")
+    args = parser.parse_args()
+
+    with open(CASES) as f:
+        cases = json.load(f)
+    names = args.cases or list(cases)
+    output = tempfile.mkdtemp(prefix="regression-")
+
+    failed = 0
+    for name in names:
+        case = cases[name]
+        frames_dir = os.path.join(output, name)
+        report = run_case(case, frames_dir)
+        if args.update:
+            update_case(name, case, report, frames_dir)
+            stages = dict(report["stages"], frame=report["frame"])
+            p95 = ", ".join(f"{stage} {stages[stage]['p95_ms']:.2f}" for stage in stages)
+            print(f"{name}: golden frames updated (p95 ms: {p95})")
+            continue
+
+        failures = check_case(name, case, report, frames_dir, args.budget_scale)
+        print(f"{name}: {'FAIL' if failures else 'ok'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed += bool(failures)
+
+    if args.update:
+        with open(CASES, "w") as f:
+            json.dump(cases, f, indent=2)
+            f.write("\n")
+    elif failed:
+        print(f"{failed} of {len(names)} cases failed, their frames are in {output}")
+        sys.exit(1)
@@ -11,4 +11,117 @@ WINDOW_HEIGHT = 800  # Increased height
 FOV = 60 * (math.pi / 180)
 
 RES = 4
-NUM_RAYS = WINDOW_WIDTH // RES
\ No newline at end of file
+NUM_RAYS = WINDOW_WIDTH // RES
+
+# dynamic resolution: the column width is changed between RES_MIN and RES_MAX pixels to keep
+# casting and rendering within FRAME_BUDGET_MS, looking at the median of the last
+# RESOLUTION_WINDOW frames. Columns are then drawn as wide as they are, so the picture keeps
+# its size (with a fixed RES every column is a 1 pixel strip and RES pixels apart)
+DYNAMIC_RESOLUTION = False
+RES_MIN = 1
+RES_MAX = 8
+FRAME_BUDGET_MS = 10
+RESOLUTION_WINDOW = 15
+
+# the game logic runs TICK_RATE times per second whatever the frame rate, at most
+# MAX_TICKS_PER_FRAME times per frame (after a slower frame the rest of the time is dropped).
+# Frames are drawn at most MAX_FPS times per second, 0 draws them as fast as possible
+TICK_RATE = 60
+MAX_TICKS_PER_FRAME = 5
+MAX_FPS = 60
+
+# let rays jump through open space using the distance to the closest wall of every tile,
+# which is tracked up to SKIP_DISTANCE_LIMIT tiles. It saves up to a third of the grid
+# lookups on open maps, but every jump costs more NumPy work than the lookups it saves: with
+# benchmark.py --no-reuse --res 1 casting took 35% longer on the built-in map and on mazes
+# (no lookups saved), as long on open 256-4096 maps and 20-35% longer on .rcworld worlds
+SKIP_EMPTY_SPACE = False
+SKIP_DISTANCE_LIMIT = 32
+
+# reuse the last frame's rays: nothing is cast while the player stands still, and when it only
+# turns by a whole number of columns the rays are shifted and only the new columns are cast.
+# The rotation may be off a whole number of columns by at most REUSE_TOLERANCE radians
+TEMPORAL_REUSE = True
+REUSE_TOLERANCE = 1e-9
+# While the view only turns, draw it at the nearest whole column step from the last cast (at
+# most half a column off) so its rays can be reused. Frames drawn between two ticks turn the
+# view by a fraction of a tick, which is hardly ever a whole number of columns
+SNAP_ROTATION = True
+
+# worker processes the rays are cast in (split into one strip of columns per worker),
+# 0 casts everything in the main process
+CAST_WORKERS = 0
+
+# cast the next frame in a background thread while the current one is drawn (see
+# CastPipeline). Only pays off with a core to spare, and every frame shows up a frame later,
+# so it's off for the lowest input latency
+PIPELINED_CASTING = False
+
+# how the 3D view is drawn: "columns" blits every wall column on its own (Raycaster.render),
+# "surfarray" draws the whole frame into a pixel buffer and blits it once (FrameRenderer)
+RENDERER = "columns"
+
+# colors of the empty space above and below the walls
+CEILING_COLOR = (0, 0, 0)
+FLOOR_COLOR = (0, 0, 0)
+
+# draw a textured floor and ceiling instead of those colors (see FloorCaster). The textures are
+# image files, None uses generated tiles
+FLOOR_CASTING = True
+FLOOR_TEXTURE = None
+CEILING_TEXTURE = None
+
+# procedural wall textures (see TextureAtlas): the family (bricks, stone or noise) of every
+# wall type of WALL_COLORS, drawn in its color, the size of the textures and the seed of
+# their random details. The atlas of all of them is cached in TEXTURE_CACHE_DIR (None
+# generates it on every start)
+WALL_TEXTURE_FAMILIES = {1: "bricks", 2: "stone", 3: "noise", 4: "bricks"}
+TEXTURE_SIZE = 64
+TEXTURE_SEED = 0
+TEXTURE_CACHE_DIR = "texture_cache"
+
+# brightness levels wall textures are darkened to ahead of time for depth shading (see
+# ShadeTable), 1 draws them without shading
+SHADE_LEVELS = 16
+
+# memory budget of the scaled texture column cache and the step its column heights are
+# rounded to (1 keeps the exact heights, bigger steps trade accuracy for more cache hits)
+COLUMN_CACHE_BYTES = 32 * 1024 * 1024
+# the most columns the cache keeps. SDL keeps a list of all the surfaces that were blitted to
+# the screen and freeing one of them searches it, so evicting gets slower the more columns
+# are kept. Measured with benchmark.py's column_cache report (--column-cache-entries): 512
+# columns hit 35% (wander) / 53% (spin) and draw fastest, 1024 only hit 2% more but draw
+# ~20% slower, and it gets worse from there
+COLUMN_CACHE_ENTRIES = 512
+COLUMN_HEIGHT_QUANTUM = 1
+
+# billboard sprites scattered over empty tiles when the game starts (see Sprites), and how
+# many scaled sprite images are kept and how much memory they may use (a sprite right in
+# front of the camera is up to 2 * WINDOW_HEIGHT pixels square, ~10 MB)
+SPRITE_COUNT = 24
+SPRITE_CACHE_ENTRIES = 256
+SPRITE_CACHE_BYTES = 32 * 1024 * 1024
+
+# minimap: size on screen, map pixels to minimap pixels, and tiles per side of the cached
+# chunks of its tile layer (at most MINIMAP_CHUNKS of them are kept)
+MINIMAP_SIZE = 200
+MINIMAP_SCALE = 0.2
+MINIMAP_CHUNK = 32
+MINIMAP_CHUNKS = 64
+
+# frame profiler: number of frames its graph and histograms cover, and whether it starts
+# enabled (it can always be toggled with F3)
+PROFILER_HISTORY = 240
+PROFILER_ENABLED = False
+
+# input log (see InputLog) whose controls are played back instead of the keyboard's, the game
+# quits when it is over. F5 starts/stops recording one while playing
+REPLAY_FILE = None
+
+# .rcmap or .rcworld file to play on (see gen_map.py), None uses the built-in map
+MAP_FILE = None
+
+# .rcworld files are split into chunks of WORLD_CHUNK x WORLD_CHUNK tiles that are read when
+# they are needed, at most WORLD_CACHE_BYTES of them are kept in memory (see ChunkedMap)
+WORLD_CHUNK = 64
+WORLD_CACHE_BYTES = 32 * 1024 * 1024